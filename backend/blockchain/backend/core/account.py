@@ -1,4 +1,3 @@
-import os
 from Crypto.PublicKey import RSA
 from .transaction import Transaction
 from ..util import util
@@ -12,28 +11,14 @@ class Account:
 
 
     def get_raw_public_key(self):
-        return RSA.import_key(bytes.fromhex(self.public_key))
+        return util.get_raw_key(self.public_key)
     
     def get_raw_private_key(self):
-        return RSA.import_key(bytes.fromhex(self.private_key))
+        return util.get_raw_key(self.private_key)
     
     def sign(self,transaction: Transaction):
-        signature = util.sign_data(util.object_to_canonical_bytes_json(transaction.body), self.get_raw_private_key())
+        signature = util.sign_data(util.object_to_canonical_bytes_json(transaction.body), self.private_key)
 
         transaction.signature = signature
         
         return signature
-
-    @staticmethod
-    def _add_new_account_to_db(new_account,port):
-        path = f"./blockchain/db/{port}_accounts.json"
-        accounts = []
-        if os.path.exists(path):
-            accounts = util.read_from_json_file(path)
-            if isinstance(accounts,list) is False:
-                accounts = []
-        
-        accounts.append(new_account)
-        util.write_to_json_file(path,accounts)
-
-
@@ -0,0 +1,81 @@
+import os
+from ..util import util
+
+class AccountRegistry:
+    # In-memory view of {port}_accounts.json, the file is only written to.
+
+    def __init__(self, port):
+        self.path = f"./blockchain/db/{str(port)}_accounts.json"
+        self.accounts = []      # same order as in the file
+        self.public_keys = {}   # {public_key: account}
+        self.indexes = {}       # {public_key: position in accounts}
+
+    def load(self):
+        accounts = []
+        if os.path.exists(self.path):
+            accounts = util.read_from_json_file(self.path)
+            if isinstance(accounts,list) is False:
+                accounts = []
+        else:
+            util.write_to_json_file(self.path,[])
+
+        self._set_accounts(accounts)
+
+    def _set_accounts(self, accounts):
+        self.accounts = []
+        self.public_keys = {}
+        self.indexes = {}
+        for account in accounts:
+            if account.get("public_key") not in self.public_keys:
+                self._append(account)
+
+    def _append(self, account):
+        self.indexes[account.get("public_key")] = len(self.accounts)
+        self.accounts.append(account)
+        self.public_keys[account.get("public_key")] = account
+
+    def contains(self, public_key):
+        return public_key in self.public_keys
+
+    def add(self, account):
+        if self.contains(account.get("public_key")):
+            return False
+
+        self._append(account)
+        util.write_to_json_file(self.path,self.accounts)
+
+        return True
+
+    def extend(self, accounts):
+        # adds the accounts that are not known yet, the file is written once
+        added = 0
+        for account in accounts:
+            if not self.contains(account.get("public_key")):
+                self._append(account)
+                added += 1
+
+        if added:
+            util.write_to_json_file(self.path,self.accounts)
+
+        return added
+
+    def since(self, count, last_public_key=None):
+        # accounts after the first count, if the caller's last account is at the same
+        # position, otherwise all of them. Returns (since, accounts)
+        if count <= 0 or count > len(self.accounts) or self.index_of(last_public_key) != count - 1:
+            return 0, self.accounts
+
+        return count, self.accounts[count:]
+
+    def replace(self, accounts):
+        self._set_accounts(accounts if isinstance(accounts,list) else [])
+        util.write_to_json_file(self.path,self.accounts)
+
+    def index_of(self, public_key):
+        return self.indexes.get(public_key)
+
+    def to_list(self):
+        return self.accounts
+
+    def __len__(self):
+        return len(self.accounts)
@@ -1,89 +1,163 @@
 from __future__ import annotations
-from datetime import datetime
 from backend.util import util
+from backend.util import merkle
+from backend.util import binary
+from backend.util import log
+from backend.core import mining
 from backend.core.transaction import Transaction
-from backend.core.block_header import BlockHeader
+from backend.core.block_header import BlockHeader, LEGACY_BLOCK_VERSION
+
+logger = log.get_logger("core")
 
 class Block:
-    def __init__(self, block_header: BlockHeader, transaction: Transaction):
+    __slots__ = ("header", "transactions")
+
+    def __init__(self, block_header: BlockHeader, transactions: list[Transaction] = None):
         self.header = block_header # meta podaci
-        self.transaction = transaction
-        self.header.merkle_root = util.hash256(transaction or "")
+        self.transactions = list(transactions or [])
+        if not self.header.merkle_root:
+            self.header.merkle_root = self.compute_merkle_root()
+
+    def compute_merkle_root(self):
+        if self.header.version == LEGACY_BLOCK_VERSION:
+            return util.hash256(self.transactions[0] if self.transactions else "")
+
+        return merkle.merkle_root([transaction.get_hash() for transaction in self.transactions])
 
     def get_hash(self):
-        return util.double_hash256(
-            str(self.header.id) +
-            (self.header.previous_block_hash or "") +
-            (self.header.merkle_root or "") +
-            str(self.header.height) +
-            str(self.header.difficulty) +
-            str(self.header.nonce) +
-            str(self.header.miner) +
-            str(self.transaction)
-        )
+        # legacy blocks also hash the string form of their only transaction
+        return self.header.get_hash(self.transactions[0] if self.transactions else None)
 
-    def mine(self, chain):
-        print(f"\n⛏️  #{self.header.height} Block Minning...")
-        while not self.header.block_hash.startswith("0" * self.header.difficulty) and chain.can_mine is True:
-            self.header.nonce+=1
-            self.header.block_hash = self.get_hash()
+    def get_size(self):
+        return sum(transaction.get_size() for transaction in self.transactions)
 
-        self.header.timestamp = datetime.now() #timestamp trenutnog bloka
+    def is_solved(self):
+        # the block hash meets the difficulty target, false for a block whose mining was stopped
+        return bool(self.header.block_hash) and self.header.block_hash.startswith("0" * self.header.difficulty)
+
+    def mine(self, chain):
+        logger.info("#%s Block mining...", self.header.height, icon="⛏️ ")
+        legacy_transaction = self.transactions[0] if self.transactions else None
+        if chain.mining_workers > 1:
+            result = chain.get_mining_engine().mine(self.header, chain, legacy_transaction)
+            if result is not None:
+                self.header.nonce, self.header.block_hash, self.header.timestamp = result
+        else:
+            target = "0" * self.header.difficulty
+            nonce, block_hash = self.header.nonce, None
+            while chain.can_mine is True and (block_hash is None or not block_hash.startswith(target)):
+                # the timestamp is hashed, it is refreshed for every batch of nonces
+                self.header.refresh_timestamp()
+                # same hash as get_hash, without rebuilding and rehashing the header for every nonce
+                hash_nonce = util.nonce_hasher(*self.header.get_hash_parts(legacy_transaction))
+                for _ in range(mining.CHECK_INTERVAL):
+                    nonce += 1
+                    block_hash = hash_nonce(nonce)
+                    if block_hash.startswith(target):
+                        break
+            # a stopped search leaves the header unsolved
+            if block_hash is not None and block_hash.startswith(target):
+                self.header.nonce, self.header.block_hash = nonce, block_hash
 
         if chain.can_mine:
-            print(f"\n✔️  #{self.header.height} Blok successfully mined by {self.header.miner} at {self.header.timestamp}.\n")
-            print("Header of new block:")
-            print(self.header)
+            logger.info("#%s Block successfully mined by %s at %s.", self.header.height, self.header.miner, self.header.timestamp, icon="✔️ ")
+            logger.debug("Header of new block: %s", self.header)
 
     @staticmethod
     def is_valid(block:Block, chain):
 
         #Validacija bloka
         #1. Provera da li blok povezan sa chain-om
-        #2. Proverava se da li ima validnu transakciju
+        #2. Proverava se da li ima validne transakcije
         #3. Proveraa se da li ima dobar merkle root
         #4. Proverava se hash, odnosno resenje proof of work-a
 
-        print(f"🔍 #{block.header.height} Block Validation: \n")
+        logger.debug("#%s Block validation", block.header.height, icon="🔍")
+
+        if block.header.previous_block_hash != chain.get_last_block().header.block_hash or block.header.height != chain.get_last_block().header.height + 1:
+            logger.warning("#%s Invalid block - Invalid previous block hash!", block.header.height, icon="❌")
+            return False
+
+        if not chain.has_valid_timestamp(block):
+            logger.warning("#%s Invalid block - Invalid timestamp!", block.header.height, icon="❌")
+            return False
 
-        if block.header.previous_block_hash != chain.get_last_block().header.block_hash:
-            print("❌ Invalid block - Invalid previous block hash!")
+        if not chain.has_valid_difficulty(block):
+            logger.warning("#%s Invalid block - Invalid difficulty or proof of work!", block.header.height, icon="❌")
             return False
         
-        if Transaction.is_valid(block.transaction,chain.port,chain.health_record) is False:
-            print("❌ Invalid block - invalid transaction!")
+        if not block.transactions:
+            logger.warning("#%s Invalid block - Block has no transactions!", block.header.height, icon="❌")
             return False
+
+        if len(block.transactions) > chain.max_block_transactions or block.get_size() > chain.max_block_bytes:
+            logger.warning("#%s Invalid block - Block is too large!", block.header.height, icon="❌")
+            return False
+
+        if len({transaction.id for transaction in block.transactions}) != len(block.transactions):
+            logger.warning("#%s Invalid block - Duplicate transactions!", block.header.height, icon="❌")
+            return False
+
+        for transaction in block.transactions:
+            health_record = chain.mempool.get_health_record(transaction.id)
+            if health_record is None or Transaction.is_valid(transaction,chain.accounts,health_record) is False:
+                logger.warning("#%s Invalid block - invalid transaction!", block.header.height, icon="❌")
+                return False
         
-        if block.header.merkle_root != util.hash256(block.transaction or ""):
-            print("❌ Invalid block - Invalid merkle root!")
+        if block.header.merkle_root != block.compute_merkle_root():
+            logger.warning("#%s Invalid block - Invalid merkle root!", block.header.height, icon="❌")
             return False
 
         if block.header.block_hash != block.get_hash():
-            print("❌ Invalid block - Invalid block hash!")
+            logger.warning("#%s Invalid block - Invalid block hash!", block.header.height, icon="❌")
             return False
         
-        print(f"\n✅ #{block.header.height} Block is valid.")
+        logger.info("#%s Block is valid.", block.header.height)
 
         return True
         
     def __str__(self):
-        return f" {{\n{self.header}, \n   Transaction: {self.transaction}\n }}"
+        transactions = ", ".join(str(transaction) for transaction in self.transactions)
+        return f" {{\n{self.header}, \n   Transactions: [{transactions}]\n }}"
 
     def to_dict(self):
         return {
             "header": self.header.to_dict() if hasattr(self.header, "to_dict") else None,
-            "transaction": self.transaction.to_dict()  if hasattr(self.transaction, "to_dict") else None
+            "transactions": [transaction.to_dict() for transaction in self.transactions]
         }
     
     @staticmethod
     def from_dict(block_dict):
-        tx = None
-        
-        if block_dict["transaction"] != None:
-            tx = Transaction.from_dict(block_dict["transaction"])
+        if "transactions" in block_dict:
+            transactions = [Transaction.from_dict(tx) for tx in block_dict["transactions"]]
+        else:
+            # blocks written before multi-transaction blocks
+            transactions = [Transaction.from_dict(block_dict["transaction"])] if block_dict.get("transaction") != None else []
 
-        block = Block(BlockHeader.from_dict(block_dict["header"]),tx)
-        block.header.merkle_root = BlockHeader.from_dict(block_dict["header"]).merkle_root
-        return block
+        # header keeps the stored merkle root, validation recomputes it
+        return Block(BlockHeader.from_dict(block_dict["header"]),transactions)
 
         
+
+    def to_bytes(self):
+        # compact binary form for library use, see util/binary.py
+        return (
+            binary.pack_uint8(binary.FORMAT_VERSION) +
+            self.header.to_bytes() +
+            binary.pack_uint32(len(self.transactions)) +
+            b"".join(transaction.to_bytes() for transaction in self.transactions)
+        )
+
+    @staticmethod
+    def read_bytes(reader:binary.Reader):
+        format_version = reader.uint8()
+        if format_version != binary.FORMAT_VERSION:
+            raise ValueError(f"Unsupported block format version {format_version}")
+
+        header = BlockHeader.read_bytes(reader)
+        transactions = [Transaction.read_bytes(reader) for _ in range(reader.uint32())]
+        return Block(header, transactions)
+
+    @staticmethod
+    def from_bytes(data:bytes):
+        return Block.read_bytes(binary.Reader(data))
@@ -1,33 +1,123 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from ..util import util
+from ..util import binary
+
+LEGACY_BLOCK_VERSION = 1 # one transaction, hashed as a string into the block hash
+MERKLE_BLOCK_VERSION = 2 # list of transactions committed through the merkle root
+BLOCK_VERSION = 3 # also commits the mining start and the timestamp, difficulty is retargeted from them
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _time_to_str(value):
+    return value.isoformat() if isinstance(value, datetime) else (value or "")
 
 class BlockHeader:
-    def __init__(self,height, difficulty, miner, previous_block_hash=None):
+    # hashes and the id are kept as raw bytes (binary.compact_hex), the properties return hex
+    __slots__ = ("version", "height", "_id", "_previous_block_hash", "_merkle_root", "timestamp", "mining_start", "difficulty", "nonce", "miner", "_block_hash")
+
+    def __init__(self,height, difficulty, miner, previous_block_hash=None, version=BLOCK_VERSION):
+        self.version = version
         self.height = height 
-        self.id = uuid.uuid4().hex
+        self._id = uuid.uuid4().bytes
         self.previous_block_hash = previous_block_hash
         self.merkle_root = '' # root merkle tree-a(hash tree)
         self.timestamp = "" #timestamp trenutnog bloka
+        self.mining_start = "" # when the miner started on this block, v3 headers only
         self.difficulty = difficulty #target difficulty
         self.nonce = 0
         self.miner = miner
         self.block_hash = ''
 
+    @property
+    def id(self):
+        return binary.expand_hex(self._id)
+
+    @id.setter
+    def id(self, value):
+        self._id = binary.compact_hex(value)
+
+    @property
+    def previous_block_hash(self):
+        return binary.expand_hex(self._previous_block_hash)
+
+    @previous_block_hash.setter
+    def previous_block_hash(self, value):
+        self._previous_block_hash = binary.compact_hex(value)
+
+    @property
+    def merkle_root(self):
+        return binary.expand_hex(self._merkle_root)
+
+    @merkle_root.setter
+    def merkle_root(self, value):
+        self._merkle_root = binary.compact_hex(value)
+
+    @property
+    def block_hash(self):
+        return binary.expand_hex(self._block_hash)
+
+    @block_hash.setter
+    def block_hash(self, value):
+        self._block_hash = binary.compact_hex(value)
+
+    def get_hash_parts(self, legacy_transaction=None):
+        # everything hashed before and after the nonce, so miners only vary the nonce
+        if self.version == LEGACY_BLOCK_VERSION:
+            prefix = (
+                str(self.id) +
+                (self.previous_block_hash or "") +
+                (self.merkle_root or "") +
+                str(self.height) +
+                str(self.difficulty)
+            )
+            return prefix, str(self.miner) + str(legacy_transaction)
+
+        # transactions are committed through the merkle root
+        prefix = (
+            str(self.version) +
+            str(self.id) +
+            (self.previous_block_hash or "") +
+            (self.merkle_root or "") +
+            str(self.height) +
+            str(self.difficulty)
+        )
+        if self.version >= BLOCK_VERSION:
+            prefix += _time_to_str(self.mining_start) + _time_to_str(self.timestamp)
+
+        return prefix, str(self.miner)
+
+    def refresh_timestamp(self):
+        # miners call this between batches of nonces, so the committed timestamp
+        # is the time the solution was found, give or take one batch
+        now = datetime.now()
+        self.timestamp = max(now, self.mining_start) if isinstance(self.mining_start, datetime) else now
+
+    def get_hash(self, legacy_transaction=None):
+        prefix, suffix = self.get_hash_parts(legacy_transaction)
+        return util.double_hash256(prefix + str(self.nonce) + suffix)
+
     def __str__(self):
-        return f"   Header: {{ \n     height: {self.height}, \n     id: {self.id}, \n     merkle root: {self.merkle_root}, \n     previous block hash: {self.previous_block_hash},\n     timestamp: {self.timestamp},\n     nonce: {self.nonce},\n     difficulty: {self.difficulty} \n     miner: {self.miner}, \n     block hash: {self.block_hash} \n   }}"
+        return f"   Header: {{ \n     version: {self.version}, \n     height: {self.height}, \n     id: {self.id}, \n     merkle root: {self.merkle_root}, \n     previous block hash: {self.previous_block_hash},\n     mining start: {self.mining_start},\n     timestamp: {self.timestamp},\n     nonce: {self.nonce},\n     difficulty: {self.difficulty} \n     miner: {self.miner}, \n     block hash: {self.block_hash} \n   }}"
 
     def to_dict(self):
-        return {
+        header_dict = {
+            "version": self.version,
             "id": self.id,
             "previous_block_hash": self.previous_block_hash,
             "merkle_root": self.merkle_root,
-            "timestamp": self.timestamp.isoformat() if isinstance(self.timestamp, datetime) else self.timestamp,
+            "timestamp": _time_to_str(self.timestamp),
             "height": self.height,
             "difficulty": self.difficulty,
             "nonce": self.nonce,
             "miner": self.miner,
             "block_hash": self.block_hash
         }
+        if self.version >= BLOCK_VERSION:
+            header_dict["mining_start"] = _time_to_str(self.mining_start)
+
+        return header_dict
     
     @staticmethod
     def from_dict(data):
@@ -35,11 +125,74 @@ class BlockHeader:
             height=data["height"],
             difficulty=data["difficulty"],
             miner=data["miner"],
-            previous_block_hash=data.get("previous_block_hash")
+            previous_block_hash=data.get("previous_block_hash"),
+            version=data.get("version", LEGACY_BLOCK_VERSION)
         )
         block.id = data["id"]
         block.merkle_root = data["merkle_root"]
         block.timestamp =  datetime.fromisoformat(data["timestamp"]) if data.get("timestamp") else ""
+        block.mining_start = datetime.fromisoformat(data["mining_start"]) if data.get("mining_start") else ""
         block.nonce = data["nonce"]
         block.block_hash = data["block_hash"]
-        return block
\ No newline at end of file
+        return block
+
+    @staticmethod
+    def _time_to_bytes(value):
+        if value in ("", None):
+            return binary.pack_uint8(0)
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return binary.pack_uint8(1) + binary.pack_int64((value - EPOCH) // timedelta(microseconds=1))
+
+        value = value.isoformat() if isinstance(value, datetime) else str(value)
+        return binary.pack_uint8(2) + binary.pack_str(value)
+
+    @staticmethod
+    def _read_timestamp(reader:binary.Reader):
+        kind = reader.uint8()
+        if kind == 0:
+            return ""
+        if kind == 1:
+            return EPOCH + timedelta(microseconds=reader.int64())
+
+        return datetime.fromisoformat(reader.str())
+
+    def to_bytes(self):
+        return (
+            binary.pack_uint8(self.version) +
+            binary.pack_uint64(self.height) +
+            binary.pack_str(self.id) +
+            binary.pack_hash(self.previous_block_hash) +
+            binary.pack_hash(self.merkle_root) +
+            BlockHeader._time_to_bytes(self.timestamp) +
+            (BlockHeader._time_to_bytes(self.mining_start) if self.version >= BLOCK_VERSION else b"") +
+            binary.pack_uint8(self.difficulty) +
+            binary.pack_uint64(self.nonce) +
+            binary.pack_str(self.miner) +
+            binary.pack_hash(self.block_hash)
+        )
+
+    @staticmethod
+    def read_bytes(reader:binary.Reader):
+        version = reader.uint8()
+        height = reader.uint64()
+        header_id = reader.str()
+        previous_block_hash = reader.hash()
+        merkle_root = reader.hash()
+        timestamp = BlockHeader._read_timestamp(reader)
+        mining_start = BlockHeader._read_timestamp(reader) if version >= BLOCK_VERSION else ""
+        difficulty = reader.uint8()
+        nonce = reader.uint64()
+        miner = reader.str()
+
+        header = BlockHeader(height, difficulty, miner, previous_block_hash, version)
+        header.id = header_id
+        header.merkle_root = merkle_root
+        header.timestamp = timestamp
+        header.mining_start = mining_start
+        header.nonce = nonce
+        header.block_hash = reader.hash()
+        return header
+
+    @staticmethod
+    def from_bytes(data:bytes):
+        return BlockHeader.read_bytes(binary.Reader(data))
@@ -0,0 +1,251 @@
+import os
+import json
+import mmap
+from array import array
+from collections import OrderedDict
+from ..util import log
+
+logger = log.get_logger("core")
+
+class BlockStore:
+    # Append-only block log: one JSON record per line in {port}_chain.log and
+    # the byte offset of every record (indexed by height) in {port}_chain.idx.
+
+    def __init__(self, port):
+        self.log_path = f"./blockchain/db/{str(port)}_chain.log"
+        self.index_path = f"./blockchain/db/{str(port)}_chain.idx"
+        self.json_path = f"./blockchain/db/{str(port)}_chain.json"
+        self.offsets = array("Q")  # offsets[height] = position of the block record in the log
+        self.size = 0
+
+    def exists(self):
+        return os.path.exists(self.log_path)
+
+    def migrate_from_json(self):
+        # one-shot migration from the old pretty-printed chain file
+        if self.exists() or os.path.exists(self.json_path) is False:
+            return False
+
+        with open(self.json_path, "r", encoding="utf-8") as f:
+            try:
+                chain_dict = json.load(f)
+            except json.JSONDecodeError:
+                chain_dict = []
+
+        if isinstance(chain_dict, list) is False:
+            chain_dict = []
+
+        self.rewrite(chain_dict)
+        os.replace(self.json_path, self.json_path + ".migrated")
+
+        return True
+
+    def open(self):
+        if self.exists() is False:
+            self.rewrite([])
+            return 0
+
+        self._recover()
+        return len(self.offsets)
+
+    def _recover(self):
+        offsets = array("Q")
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+
+        size = os.path.getsize(self.log_path)
+
+        # drop index entries written for records that never reached the log
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+
+        # re-check the last indexed record and pick up complete records appended
+        # after it, stopping at the first torn or unparsable one
+        position = offsets.pop() if offsets else 0
+        with open(self.log_path, "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                offsets.append(position)
+                position += len(line)
+
+        if position != size:
+            logger.warning("Block log %s has an incomplete record, truncating to %s bytes.", self.log_path, position)
+            with open(self.log_path, "r+b") as f:
+                f.truncate(position)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.offsets = offsets
+        self.size = position
+        self._write_index()
+
+    def _write_index(self):
+        with open(self.index_path, "wb") as f:
+            self.offsets.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _encode_record(block_dict):
+        return (json.dumps(block_dict, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+    def read_all(self):
+        blocks = []
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                if len(blocks) == len(self.offsets):
+                    break
+                blocks.append(json.loads(line))
+
+        return blocks
+
+    def read(self, height):
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offsets[height])
+            return json.loads(f.readline())
+
+    def append(self, block_dict):
+        record = self._encode_record(block_dict)
+
+        with open(self.log_path, "ab") as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        offset = array("Q", [self.size])
+        with open(self.index_path, "ab") as f:
+            offset.tofile(f)
+
+        self.offsets.append(self.size)
+        self.size += len(record)
+
+    def record_size(self, height):
+        end = self.offsets[height + 1] if height + 1 < len(self.offsets) else self.size
+        return end - self.offsets[height]
+
+    def truncate(self, count):
+        # keeps the first count records (switching to another peer's fork)
+        if count >= len(self.offsets):
+            return
+
+        # log first, index entries past the end of the log are dropped on open
+        position = self.offsets[count]
+        with open(self.log_path, "r+b") as f:
+            f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+
+        del self.offsets[count:]
+        self.size = position
+        self._write_index()
+
+    def rewrite(self, chain_dict):
+        # used when the whole chain is replaced (sync from another peer)
+        tmp_path = self.log_path + ".tmp"
+        offsets = array("Q")
+        position = 0
+
+        with open(tmp_path, "wb") as f:
+            for block_dict in chain_dict:
+                record = self._encode_record(block_dict)
+                f.write(record)
+                offsets.append(position)
+                position += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # without an index the next open re-scans the whole log, so a crash
+        # between the two replacements can never pair the new log with old offsets
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(tmp_path, self.log_path)
+
+        self.offsets = offsets
+        self.size = position
+        self._write_index()
+
+
+class LazyBlocks:
+    # List-like view of the blocks in a BlockStore. Only the height -> offset index
+    # is resident; blocks are decoded on demand from a memory-mapped log and kept
+    # in a small LRU.
+
+    def __init__(self, store:BlockStore, decode, cache_size=1024):
+        self.store = store
+        self.decode = decode # record dict -> Block
+        self.cache_size = cache_size
+        self.cache = OrderedDict() # {height: Block}
+        self.map = None
+
+    def __len__(self):
+        return len(self.store.offsets)
+
+    def _remap(self):
+        if self.map is not None:
+            self.map.close()
+        with open(self.store.log_path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read(self, height):
+        start = self.store.offsets[height]
+        end = self.store.offsets[height + 1] if height + 1 < len(self.store.offsets) else self.store.size
+
+        # the log grows with every appended block
+        if self.map is None or end > len(self.map):
+            self._remap()
+
+        return json.loads(self.map[start:end])
+
+    def _get(self, height):
+        block = self.cache.get(height)
+        if block is not None:
+            self.cache.move_to_end(height)
+            return block
+
+        block = self.decode(self._read(height))
+        self._cache(height, block)
+        return block
+
+    def _cache(self, height, block):
+        self.cache[height] = block
+        self.cache.move_to_end(height)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(height) for height in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("block height out of range")
+
+        return self._get(index)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self._get(height)
+
+    def append(self, block):
+        # the record itself is written by BlockStore.append
+        self._cache(block.header.height, block)
+
+    def truncate(self, count):
+        # the records themselves are dropped by BlockStore.truncate
+        for height in [height for height in self.cache if height >= count]:
+            del self.cache[height]
+
+    def close(self):
+        self.cache.clear()
+        if self.map is not None:
+            self.map.close()
+            self.map = None
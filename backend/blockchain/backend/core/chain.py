@@ -1,102 +1,217 @@
 from __future__ import annotations
 import os
+from datetime import datetime, timedelta
 from backend.core.block import Block
-from backend.core.block_header import BlockHeader
+from backend.core.block_header import BlockHeader, LEGACY_BLOCK_VERSION, BLOCK_VERSION
+from backend.core.block_store import BlockStore, LazyBlocks
+from backend.core.mempool import Mempool
+from backend.core.mining import MiningEngine
 from backend.core.transaction import Transaction
 from backend.util import util
+from backend.util import merkle
+from backend.util import log
+
+logger = log.get_logger("core")
+
+MAX_CLOCK_DRIFT = timedelta(minutes=2) # how far ahead of our clock a block timestamp may be
 
 class Chain:
-    def __init__(self, miner, initial_time_to_mine = 30000, initial_difficulty = 5):
-        self.difficulty = initial_difficulty
-        self.time_to_mine = initial_time_to_mine #TODO ako stignem da namestim da se automatski podesava vreme kopanja
+    def __init__(self, miner, initial_time_to_mine = 30000, initial_difficulty = 5, max_block_transactions = 100, max_block_bytes = 1_000_000, mining_workers = None, retarget_interval = 10):
+        self.difficulty = initial_difficulty # difficulty of the genesis block, then of the last block created
+        self.time_to_mine = initial_time_to_mine # target mining time of a block in ms
+        self.retarget_interval = max(2, retarget_interval) # difficulty is adjusted every retarget_interval blocks
         self.miner = miner
         self.chain = [self.create_genesis_block()] 
-        self.tx = None
-        self.health_record = None
+        self.max_block_transactions = max_block_transactions
+        self.max_block_bytes = max_block_bytes # size of the canonical JSON of the block transactions
+        self.mempool = Mempool()  # validated transactions waiting for a block
+        self.accounts = None  # AccountRegistry, set by the peer
         self.mined_block = None
+        self.mining_workers = mining_workers or os.cpu_count() or 1 # 1 mines in the calling thread
+        self.mining_engine = None
+        self.checkpoint_path = None  # set when the chain is loaded from disk
         self.is_mining = False
         self.can_mine = True
+        self.health_record_index = {}  # {health_record_id: (height, health_record_hash)}
+        self.transaction_index = set()  # ids of the transactions in blocks
+        self.patient_index = {}  # {patient key digest: [height, ...]}
+        self.indexes_built = True
+        self.lazy = False  # blocks are read on demand from the block log
         
 
     def create_genesis_block(self):
-        genesis_block = Block(BlockHeader(0,self.difficulty,None,"0"*64),None)
-        genesis_block.miner = None
+        # genesis keeps the original format so existing chains keep the same genesis hash
+        genesis_block = Block(BlockHeader(0,self.difficulty,None,"0"*64,LEGACY_BLOCK_VERSION),None)
+        genesis_block.header.miner = None
         genesis_block.header.id = "1"
         genesis_block.header.timestamp = ""
         genesis_block.header.block_hash = genesis_block.get_hash()
 
         return genesis_block
 
+    def get_mining_engine(self):
+        if self.mining_engine is None:
+            self.mining_engine = MiningEngine(self.mining_workers)
+
+        return self.mining_engine
+
     def get_last_block(self):
         return self.chain[-1]
 
     def create_new_block(self):
-        
+        return self.mine_block(self.prepare_block())
+
+    def prepare_block(self):
+        # the unmined next block, reads the chain and the mempool so it runs on the
+        # peer's event loop, only mine_block runs on the mining thread
         self.is_mining = True
 
         last_block = self.get_last_block()
         new_block_height = last_block.header.height + 1
+        self.difficulty = self.get_expected_difficulty(new_block_height)
 
-        block = Block(BlockHeader(new_block_height,self.difficulty,self.miner,last_block.header.block_hash),self.tx)
-        
+        block = Block(BlockHeader(new_block_height,self.difficulty,self.miner,last_block.header.block_hash),self.select_transactions())
+        block.header.mining_start = datetime.now()
+        if isinstance(last_block.header.timestamp, datetime):
+            # after the previous block even when its miner's clock is ahead of ours
+            block.header.mining_start = max(block.header.mining_start, last_block.header.timestamp + timedelta(microseconds=1))
+
+        return block
+
+    def mine_block(self, block: Block):
         block.mine(self)
 
-        self.mined_block = block
+        # a block whose mining was stopped never takes part in consensus
+        if self.can_mine and block.is_solved():
+            self.mined_block = block
 
         return block
     
+    def get_expected_difficulty(self, height):
+        # Difficulty of the block at height: the previous block's, retargeted every
+        # retarget_interval blocks from the mining time (timestamp - mining start)
+        # committed in the headers of the last interval. Blocks are only mined when
+        # there are transactions, so the time between blocks would mostly be idle time.
+        # One step is 16x the work, so it only moves when the average mining time
+        # is more than 4x off time_to_mine.
+        difficulty = self.chain[height - 1].header.difficulty
+        if height % self.retarget_interval != 0 or height - self.retarget_interval < 1:
+            return difficulty
+
+        mining_time = 0
+        for block in self.chain[height - self.retarget_interval:height]:
+            # intervals with blocks from before v3 headers are not retargeted
+            if block.header.version < BLOCK_VERSION:
+                return difficulty
+            mining_time += (block.header.timestamp - block.header.mining_start) / timedelta(milliseconds=1)
+        mining_time /= self.retarget_interval
+
+        if mining_time * 4 < self.time_to_mine:
+            return difficulty + 1
+        if mining_time > self.time_to_mine * 4 and difficulty > 1:
+            return difficulty - 1
+
+        return difficulty
+
+    def has_valid_timestamp(self, block: Block):
+        # v3 headers commit their mining start and timestamp: mining starts after the
+        # previous block and the block is found after mining starts, not in the future
+        header = block.header
+        if header.version < BLOCK_VERSION:
+            return True
+        if not isinstance(header.mining_start, datetime) or not isinstance(header.timestamp, datetime):
+            return False
+        if header.mining_start.tzinfo is not None or header.timestamp.tzinfo is not None:
+            return False
+
+        previous_timestamp = self.chain[header.height - 1].header.timestamp
+        if isinstance(previous_timestamp, datetime) and header.mining_start <= previous_timestamp:
+            return False
+
+        return header.mining_start <= header.timestamp <= datetime.now() + MAX_CLOCK_DRIFT
+
+    def has_valid_difficulty(self, block: Block):
+        # blocks from before retargeting keep the difficulty they were mined with
+        if block.header.version != LEGACY_BLOCK_VERSION and block.header.difficulty != self.get_expected_difficulty(block.header.height):
+            return False
+
+        return block.header.block_hash.startswith("0" * block.header.difficulty)
+
     def add_to_block_to_chain(self, block: Block):
         
+        self.store.append(block.to_dict())
         self.chain.append(block)
-        path = f"./blockchain/db/{str(self.port)}_chain.json"
-        chain_dict  = []
-        for block in self.chain:
-            chain_dict.append(block.to_dict())
-        
-        util.write_to_json_file(path,chain_dict)
+        if self.indexes_built:
+            self._index_block(block)
 
-        self.tx = None
-        self.health_record = None
+        self.remove_transactions([transaction.id for transaction in block.transactions])
         
     def add_transaction(self, transaction:Transaction, health_record):
-        if Transaction.is_valid(transaction, self.port,health_record) is False:
+        if self.is_committed(transaction):
+            return False
+
+        if Transaction.is_valid(transaction, self.accounts,health_record) is False:
             return False 
          
-        self.tx = transaction
-        self.health_record = health_record
+        return self.mempool.add(transaction, health_record)
 
-        return True
+    def is_committed(self, transaction:Transaction):
+        # the transaction id or its health record is already in a block
+        self._ensure_indexes()
+        return transaction.id in self.transaction_index or transaction.body.health_record_id in self.health_record_index
+
+    def accept_transaction(self, transaction_id):
+        self.mempool.accept(transaction_id)
+
+    def has_accepted_transactions(self):
+        return self.mempool.accepted_count() > 0
+
+    def remove_transactions(self, transaction_ids):
+        self.mempool.remove(transaction_ids)
+
+    def select_transactions(self):
+        return self.mempool.select(self.max_block_transactions, self.max_block_bytes)
          
-    def load_chain_from_file(self,port):
-        path = f"./blockchain/db/{str(port)}_chain.json"
-        if os.path.exists(path):
-            chain_dict = util.read_from_json_file(path)
-            if(len(chain_dict) == 0):
-                util.write_to_json_file(path,[self.chain[0].to_dict()])
-                return 
-            
-            self.chain = []
+    def load_chain_from_file(self,port, lazy = False):
+        self.store = BlockStore(port)
+        self.checkpoint_path = f"./blockchain/db/{str(port)}_checkpoint.json"
 
-            for block in chain_dict:
-                self.chain.append(Block.from_dict(block))
+        if self.store.migrate_from_json():
+            logger.info("Chain migrated from %s to %s", self.store.json_path, self.store.log_path, icon="📦")
 
-            print(f"Chain loaded from file at {util.get_current_time_precise()}")
-        else:
-            util.write_to_json_file(path,[self.chain[0].to_dict()])
+        if self.store.open() == 0:
+            self.store.append(self.chain[0].to_dict())
+            return
+
+        if lazy:
+            # only the height -> offset index is loaded, indexes are built on first lookup
+            self.lazy = True
+            self.chain = LazyBlocks(self.store, Block.from_dict)
+            self.indexes_built = False
+            logger.info("Chain opened lazily (%s blocks)", len(self.chain), icon="📦")
+            return
 
-    def chech_accounts_db(self,port):
-        path = f"./blockchain/db/{str(port)}_accounts.json"
-        if os.path.exists(path) is False:
-            util.write_to_json_file(path,[])
+        self.chain = []
+
+        for block in self.store.read_all():
+            self.chain.append(Block.from_dict(block))
+
+        self.build_indexes()
+
+        logger.info("Chain loaded from file", icon="📦")
 
     def chain_from_dict(self,chain_dict:dict[str,any]):
-        path = f"./blockchain/db/{str(self.port)}_chain.json"
         self.chain = []
 
         for block in chain_dict:
             self.chain.append(Block.from_dict(block))
 
-        util.write_to_json_file(path,chain_dict)
+        self.build_indexes()
+
+        self.store.rewrite(chain_dict)
+
+        if self.lazy:
+            self.chain = LazyBlocks(self.store, Block.from_dict)
     
 
     def chain_to_dict(self):
@@ -106,25 +221,133 @@ class Chain:
         
         return chain_dict
 
+    def get_blocks(self, from_height, to_height=None, max_bytes=None):
+        # blocks from_height..to_height (inclusive) as dicts, to_height defaults to the last block.
+        # With max_bytes the range is cut to about that many bytes of stored records,
+        # keeping at least the first two blocks so a sync always makes progress
+        last_height = len(self.chain) - 1
+        to_height = last_height if to_height is None else min(to_height, last_height)
+        if from_height < 0 or from_height > to_height:
+            return []
+
+        if max_bytes is not None:
+            size = 0
+            end = from_height
+            while end <= to_height:
+                size += self.store.record_size(end)
+                if size > max_bytes and end > from_height + 1:
+                    break
+                end += 1
+            to_height = end - 1
+
+        return [block.to_dict() for block in self.chain[from_height:to_height + 1]]
+
+    def truncate(self, height):
+        # keeps blocks 0..height, used before syncing another peer's fork from its common ancestor
+        if height >= len(self.chain) - 1:
+            return
+
+        self.store.truncate(height + 1)
+        if self.lazy:
+            self.chain.truncate(height + 1)
+        else:
+            del self.chain[height + 1:]
+
+        # rebuilt on the next lookup
+        self.indexes_built = False
+        self.health_record_index = {}
+        self.transaction_index = set()
+        self.patient_index = {}
+
+    def extend_from_dict(self, chain_dict):
+        # appends blocks that continue the local chain, stops at the first one that does not
+        for block_dict in chain_dict:
+            block = Block.from_dict(block_dict)
+            last_block = self.get_last_block()
+            if (
+                block.header.height != last_block.header.height + 1
+                or block.header.previous_block_hash != last_block.header.block_hash
+                or block.header.merkle_root != block.compute_merkle_root()
+                or block.header.block_hash != block.get_hash()
+                or not self.has_valid_timestamp(block)
+                or not self.has_valid_difficulty(block)
+            ):
+                logger.warning("Block #%s does not continue the local chain!", block.header.height, icon="❌")
+                return False
+
+            self.add_to_block_to_chain(block)
+
+        return True
+
+    def _index_block(self, block: Block):
+        height = block.header.height
+        for transaction in block.transactions:
+            body = transaction.body
+            self.transaction_index.add(transaction.id)
+            # first occurrence wins, same as a linear scan from genesis
+            self.health_record_index.setdefault(body.health_record_id, (height, body.health_record_hash))
+
+            heights = self.patient_index.setdefault(util.key_digest(body.patient), [])
+            if not heights or heights[-1] != height:
+                heights.append(height)
+
+    def build_indexes(self):
+        self.health_record_index = {}
+        self.transaction_index = set()
+        self.patient_index = {}
+        for height in range(1, len(self.chain)):
+            self._index_block(self.chain[height])
+
+        self.indexes_built = True
+
+    def _ensure_indexes(self):
+        if self.indexes_built is False:
+            logger.info("Building chain indexes", icon="📦")
+            self.build_indexes()
+
     def find_health_record(self, health_record_id):
-        for block in self.chain[1::]:
-            if block.transaction.body.health_record_id == health_record_id:
-                return block.transaction.body.health_record_hash
-            
-        return None
+        self._ensure_indexes()
+        entry = self.health_record_index.get(health_record_id)
+        if entry is None:
+            return None
+
+        return entry[1]
+    
+    def get_health_record_proof(self, health_record_id):
+        self._ensure_indexes()
+        entry = self.health_record_index.get(health_record_id)
+        if entry is None:
+            return None
+
+        block = self.chain[entry[0]]
+        hashes = [transaction.get_hash() for transaction in block.transactions]
+        index = next(i for i, transaction in enumerate(block.transactions) if transaction.body.health_record_id == health_record_id)
+
+        return {
+            "header": block.header.to_dict(),
+            "transaction": block.transactions[index].to_dict(),
+            "path": merkle.merkle_proof(hashes, index)
+        }
     
     def find_all_transactions_with_public_key(self,public_key:str):
         
+        self._ensure_indexes()
         transactions = []
-        for block in self.chain[1::]:
-            if block.transaction.body.patient == public_key:
-                transactions.append(block.transaction.body.to_dict())
+        for height in self.patient_index.get(util.key_digest(public_key), []):
+            # digests are short, so compare the full key to rule out collisions
+            for transaction in self.chain[height].transactions:
+                if transaction.body.patient == public_key:
+                    transactions.append(transaction.body.to_dict())
 
         return transactions
 
     @staticmethod
-    def is_valid(chain: Chain):
-        for i in range(1, len(chain.chain)):
+    def is_valid(chain: Chain, full_verify = False, audit = False, workers = None):
+        # blocks up to a saved checkpoint were already validated, full_verify re-hashes everything
+        # and audit additionally re-checks every transaction signature across worker processes
+        start = 1 if full_verify or audit else chain.get_checkpoint_height() + 1
+
+        for i in range(start, len(chain.chain)):
             current_block:Block = chain.chain[i]
             prev_block:Block = chain.chain[i - 1]
 
@@ -132,15 +355,66 @@ class Chain:
                 continue
             else:
                 if (
-                    current_block.header.block_hash != current_block.get_hash()
+                    current_block.header.merkle_root != current_block.compute_merkle_root()
+                    or current_block.header.block_hash != current_block.get_hash()
                     or prev_block.header.block_hash != current_block.header.previous_block_hash
+                    or not chain.has_valid_timestamp(current_block)
+                    or not chain.has_valid_difficulty(current_block)
                 ):
-                    print(f"❌ {chain.miner} Node chain is invalid!")
+                    logger.error("%s Node chain is invalid!", chain.miner, icon="❌")
                     return False
             
-        print(f"\n✅ {chain.miner} Node chain is valid.")
+        if audit and Chain._audit_signatures(chain, workers) is False:
+            logger.error("%s Node chain is invalid!", chain.miner, icon="❌")
+            return False
+
+        chain.save_checkpoint()
+
+        logger.info("%s Node chain is valid%s.", chain.miner, "" if start <= 1 else f" ({len(chain.chain) - start} blocks checked after checkpoint)")
         return True
 
+    @staticmethod
+    def _audit_signatures(chain: Chain, workers = None):
+        transactions = [transaction for block in chain.chain[1::] for transaction in block.transactions]
+        items = [(util.object_to_canonical_bytes_json(transaction.body), transaction.signature, transaction.body.creator) for transaction in transactions]
+
+        results = util.verify_signatures_batch(items, workers)
+
+        invalid = [transaction.id for transaction, is_valid in zip(transactions, results) if is_valid is False]
+        if invalid:
+            logger.error("%s Node chain has %s transactions with invalid signatures, first: %s", chain.miner, len(invalid), invalid[0], icon="❌")
+            return False
+
+        logger.info("%s Node chain signatures are valid (%s transactions).", chain.miner, len(items))
+        return True
+
+    def get_checkpoint_height(self):
+        # checkpoint = {"height": H, "block_hash": X}, chain valid up to height H with tip hash X
+        if self.checkpoint_path is None or os.path.exists(self.checkpoint_path) is False:
+            return 0
+
+        checkpoint = util.read_from_json_file(self.checkpoint_path)
+        if not isinstance(checkpoint, dict) or not isinstance(checkpoint.get("height"), int):
+            return 0
+
+        height = checkpoint["height"]
+        if height >= len(self.chain):
+            return 0
+
+        # the checkpointed block itself is re-hashed, so a replaced chain is validated again
+        block = self.chain[height]
+        if block.header.block_hash != checkpoint.get("block_hash") or block.get_hash() != block.header.block_hash:
+            return 0
+
+        return height
+
+    def save_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+
+        last_block = self.get_last_block()
+        util.write_to_json_file(self.checkpoint_path, {"height": last_block.header.height, "block_hash": last_block.header.block_hash})
+
 
     def __str__(self):
         chain_to_string = "\nChain: \n[\n"
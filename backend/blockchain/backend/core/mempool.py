@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from .transaction import Transaction
+
+class Mempool:
+    # Validated transactions waiting for a block, oldest first. Only transactions
+    # accepted by network consensus are handed out for a block.
+
+    def __init__(self, max_transactions=10_000, max_bytes=50_000_000, max_per_creator=1_000):
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self.max_per_creator = max_per_creator # one creator cannot fill the pool
+        self.transactions = OrderedDict()  # {transaction_id: transaction}
+        self.health_records = {}  # {transaction_id: health_record}
+        self.sizes = {}  # {transaction_id: canonical JSON size}
+        self.creators = {}  # {creator public key: {transaction_id, ...}}
+        self.accepted = set()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __contains__(self, transaction_id):
+        return transaction_id in self.transactions
+
+    def add(self, transaction:Transaction, health_record):
+        # False when the pool or the creator's share of it is full. The id is not signed,
+        # so an id that is already in the pool is only accepted again for the same transaction
+        pooled = self.transactions.get(transaction.id)
+        if pooled is not None:
+            return pooled.get_hash() == transaction.get_hash()
+
+        size = transaction.get_size()
+        if len(self.transactions) >= self.max_transactions or self.size + size > self.max_bytes:
+            return False
+        if len(self.creators.get(transaction.body.creator, ())) >= self.max_per_creator:
+            return False
+
+        self.transactions[transaction.id] = transaction
+        self.health_records[transaction.id] = health_record
+        self.sizes[transaction.id] = size
+        self.creators.setdefault(transaction.body.creator, set()).add(transaction.id)
+        self.size += size
+
+        return True
+
+    def get_health_record(self, transaction_id):
+        return self.health_records.get(transaction_id)
+
+    def accept(self, transaction_id):
+        if transaction_id in self.transactions:
+            self.accepted.add(transaction_id)
+
+    def accepted_count(self):
+        return len(self.accepted)
+
+    def remove(self, transaction_ids):
+        for transaction_id in transaction_ids:
+            transaction = self.transactions.pop(transaction_id, None)
+            if transaction is None:
+                continue
+
+            self.health_records.pop(transaction_id, None)
+            self.size -= self.sizes.pop(transaction_id)
+            self.accepted.discard(transaction_id)
+
+            creator_transactions = self.creators.get(transaction.body.creator)
+            creator_transactions.discard(transaction_id)
+            if not creator_transactions:
+                del self.creators[transaction.body.creator]
+
+    def select(self, max_transactions, max_bytes):
+        # oldest accepted first, up to the block transaction and size limits
+        selected = []
+        size = 0
+        for transaction_id, transaction in self.transactions.items():
+            if transaction_id not in self.accepted:
+                continue
+            if len(selected) == max_transactions:
+                break
+            if size + self.sizes[transaction_id] > max_bytes:
+                break
+            selected.append(transaction)
+            size += self.sizes[transaction_id]
+
+        return selected
@@ -0,0 +1,91 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from backend.util import util
+
+# Proof of work across processes: worker i tries nonces start + i, start + i + n, ...
+# and every worker polls a shared stop event, set as soon as one of them finds a
+# solution or the chain stops mining (chain.can_mine = False).
+
+CHECK_INTERVAL = 2048 # nonces between two checks of the stop event
+POLL_INTERVAL = 0.05 # seconds between two checks of chain.can_mine
+
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _search_nonce(header, legacy_transaction, target, start, step):
+    nonce = start
+    attempts = 0
+    while not _stop_event.is_set():
+        # the timestamp is hashed, it is refreshed for every batch of nonces
+        header.refresh_timestamp()
+        hash_nonce = util.nonce_hasher(*header.get_hash_parts(legacy_transaction))
+        for _ in range(CHECK_INTERVAL):
+            block_hash = hash_nonce(nonce)
+            attempts += 1
+            if block_hash.startswith(target):
+                return nonce, block_hash, header.timestamp, attempts
+            nonce += step
+
+    return None, None, None, attempts
+
+
+class MiningEngine:
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn, the peer process already runs the event loop and the mining thread
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.executor = None
+        self.attempts = 0 # hashes computed by the last mine call
+        self.closed = False
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self.context,
+                initializer=_init_worker,
+                initargs=(self.stop_event,)
+            )
+
+        return self.executor
+
+    def mine(self, header, chain, legacy_transaction=None):
+        # returns (nonce, block_hash, timestamp), or None if mining was stopped
+        target = "0" * header.difficulty
+
+        self.stop_event.clear()
+        self.attempts = 0
+        if self.closed:
+            return None
+
+        executor = self._get_executor()
+        pending = {executor.submit(_search_nonce, header, legacy_transaction, target, header.nonce + i, self.workers) for i in range(self.workers)}
+
+        result = None
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                nonce, block_hash, timestamp, attempts = future.result()
+                self.attempts += attempts
+                if nonce is not None and result is None:
+                    result = (nonce, block_hash, timestamp)
+
+            if result is not None or chain.can_mine is False:
+                self.stop_event.set()
+
+        return result
+
+    def shutdown(self):
+        # stops the workers, otherwise they keep searching and the process can't exit
+        self.closed = True
+        self.stop_event.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
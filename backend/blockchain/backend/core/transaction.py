@@ -2,53 +2,68 @@ from __future__ import annotations
 import uuid
 from .transaction_body import TransactionBody
 from ..util import util
+from ..util import binary
+from ..util import log
+
+logger = log.get_logger("core")
 
 class Transaction:
+    __slots__ = ("signature", "body", "_id")
+
     def __init__(self, transaction_body:TransactionBody):
         self.signature:bytes = None
         self.body = transaction_body
-        self.id = uuid.uuid4().hex
+        self._id = uuid.uuid4().bytes
+
+    @property
+    def id(self):
+        return binary.expand_hex(self._id)
+
+    @id.setter
+    def id(self, value):
+        self._id = binary.compact_hex(value)
 
     @staticmethod
-    def is_valid(transaction: Transaction, peer_id ,health_record):
+    def is_valid(transaction: Transaction, accounts ,health_record):
         
         #Validacija transakcije
         #1. Provera da li postoje adrese u bazi
         #2. Proverava se da li je digitani potpis vaslidan
         #3. Proveraa se da li zdravstveni zapis sadrzi obavezna polja i da li transakcija sadrzi sva obavezna polja
 
-        print(f"🔍 Transaction {transaction.id} Validation: ")
-        accounts = util.read_from_json_file(f"./blockchain/db/{peer_id}_accounts.json")
+        logger.debug("Transaction %s validation", transaction.id, icon="🔍")
 
-        if isinstance(accounts,list) is False:
-            print("❌ Addresses are invalid!")
+        if not accounts.contains(transaction.body.creator) or not accounts.contains(transaction.body.patient): 
+            logger.warning("Transaction %s: address is invalid!", transaction.id, icon="❌")
             return False
 
-        if not [a for a in accounts if a.get("public_key") == transaction.body.creator] or not [a for a in accounts if a.get("public_key") == transaction.body.patient]: 
-            print("❌ Addresse is invalid!")
-            return False
-
-        print("✅ Addresses are valid.")
+        logger.debug("Transaction %s: addresses are valid.", transaction.id)
 
         bytes_object = util.object_to_canonical_bytes_json(transaction.body)
 
-        if util.verify_signature(bytes_object, transaction.signature, util.get_raw_key(transaction.body.creator)) is False:
+        if util.verify_signature(bytes_object, transaction.signature, transaction.body.creator) is False:
             return False
 
         required_keys = ["_id", "patient_id", "patient_first_name","patient_last_name","doctor_first_name","doctor_last_name","doctor_id","health_authority_name","health_authority_id","date"]
 
         if all(key in health_record for key in required_keys) is False or transaction.body.health_record_id == None or transaction.body.date is None:
-            print(f"❌ Transaction {transaction.id} is invalid!") 
+            logger.warning("Transaction %s is invalid!", transaction.id, icon="❌")
             return False
 
         if util.hash256(health_record) != transaction.body.health_record_hash:
-            print(f"❌ Transaction {transaction.id} is invalid!") 
+            logger.warning("Transaction %s is invalid!", transaction.id, icon="❌")
             return False
 
-        print(f"✅ Transaction {transaction.id} is valid.")
+        logger.debug("Transaction %s is valid.", transaction.id)
     
     def __str__(self):
         return f"{self.body}"
+
+    def get_hash(self):
+        return util.transaction_hash(self.to_dict())
+
+    def get_size(self):
+        return len(util.object_to_canonical_bytes_json(self.to_dict()))
     
     def to_dict(self):
         return {
@@ -64,7 +79,18 @@ class Transaction:
         tx.id = transaction_dict.get("id")
         return tx
 
+    def to_bytes(self):
+        return binary.pack_str(self.id) + binary.pack_bytes(self.signature) + self.body.to_bytes()
 
+    @staticmethod
+    def read_bytes(reader:binary.Reader):
+        transaction_id = reader.str()
+        signature = reader.bytes()
+        tx = Transaction(TransactionBody.read_bytes(reader))
+        tx.id = transaction_id
+        tx.signature = signature
+        return tx
 
-
-
+    @staticmethod
+    def from_bytes(data:bytes):
+        return Transaction.read_bytes(binary.Reader(data))
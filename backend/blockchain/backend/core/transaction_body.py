@@ -1,11 +1,25 @@
+import sys
+from ..util import binary
+
 class TransactionBody:
+    __slots__ = ("creator", "patient", "_health_record_hash", "date", "health_record_id")
+
     def __init__(self, creator, patient, health_record_id,date,health_record_hash:str = None):
-        self.creator = creator
-        self.patient = patient
+        # the same few account keys repeat in every block, interning keeps one copy of each
+        self.creator = sys.intern(creator) if isinstance(creator, str) else creator
+        self.patient = sys.intern(patient) if isinstance(patient, str) else patient
         self.health_record_hash = health_record_hash
         self.date = date
         self.health_record_id = health_record_id
 
+    @property
+    def health_record_hash(self):
+        return binary.expand_hex(self._health_record_hash)
+
+    @health_record_hash.setter
+    def health_record_hash(self, value):
+        self._health_record_hash = binary.compact_hex(value)
+
     def __str__(self):
         return f"{{\n     creator: {self.creator}, \n     patient: {self.patient}, \n     health_record_hash: {self.health_record_hash}, \n     health_record_id: {self.health_record_id}, \n     date: {self.date}\n   }}"
     
@@ -20,4 +34,26 @@ class TransactionBody:
     
     @staticmethod
     def from_dict(transaction_body_dict:str):
-        return TransactionBody(transaction_body_dict.get("creator"),transaction_body_dict.get("patient"), transaction_body_dict.get("health_record_id"),transaction_body_dict.get("date"),transaction_body_dict.get("health_record_hash"))
\ No newline at end of file
+        return TransactionBody(transaction_body_dict.get("creator"),transaction_body_dict.get("patient"), transaction_body_dict.get("health_record_id"),transaction_body_dict.get("date"),transaction_body_dict.get("health_record_hash"))
+
+    def to_bytes(self):
+        return (
+            binary.pack_key(self.creator) +
+            binary.pack_key(self.patient) +
+            binary.pack_hash(self.health_record_hash) +
+            binary.pack_str(self.health_record_id) +
+            binary.pack_str(self.date)
+        )
+
+    @staticmethod
+    def read_bytes(reader:binary.Reader):
+        creator = reader.key()
+        patient = reader.key()
+        health_record_hash = reader.hash()
+        health_record_id = reader.str()
+        date = reader.str()
+        return TransactionBody(creator, patient, health_record_id, date, health_record_hash)
+
+    @staticmethod
+    def from_bytes(data:bytes):
+        return TransactionBody.read_bytes(binary.Reader(data))
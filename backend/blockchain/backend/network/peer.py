@@ -1,41 +1,81 @@
 import asyncio
+import logging
 import websockets
 import json
 from datetime import datetime
 import uuid
+import random
 import threading
-from collections import deque
+from collections import deque, OrderedDict
 from backend.util import util
+from backend.util import codec
+from backend.util import log
 from backend.core.chain import Chain
 from backend.core.transaction import Transaction
 from backend.core.block import Block
-from backend.core.account import Account
+from backend.core.account_registry import AccountRegistry
 
 class Peer:
-    def __init__(self, port=8765):
+    def __init__(self, port=8765, mining_workers=None, full_verify=False, audit=False, lazy=False, block_assembly_window=0.05, difficulty=5, compression="zlib", permessage_deflate=False, encoding=None, send_queue_size=1000, send_timeout=5.0, slow_peer_policy="disconnect", gossip_degree=None, gossip_ttl=6, log_level=None):
         self.port = port
         self.my_uri = f"ws://localhost:{port}"
         self.my_id = str(uuid.uuid4())[:8]
-        self.chain = Chain(self.my_id)
-        self.chain.load_chain_from_file(port)
+        # every peer logs to its own logger, log_level None follows log.configure
+        self.log = log.get_logger(f"peer.{self.my_id}", peer=self.my_id)
+        if log_level is not None:
+            self.log.setLevel(log_level)
+        # difficulty only applies to a new chain, after that it follows the blocks
+        self.chain = Chain(self.my_id, initial_difficulty=difficulty, mining_workers=mining_workers)
+        self.chain.load_chain_from_file(port, lazy)
         self.chain.port = self.port
-        self.chain.chech_accounts_db(self.port)
+
+        self.accounts = AccountRegistry(self.port)
+        self.accounts.load()
+        self.chain.accounts = self.accounts
+
+        # a peer never serves a chain it could not validate
+        if Chain.is_valid(self.chain, full_verify, audit) is False:
+            raise ValueError(f"Local chain in {self.chain.store.log_path} is invalid, remove it to resync from a peer")
 
         self.incoming_peers = {}    # {ws: peer_info}
         self.outgoing_peers = {}    # {uri: ws}
+
+        self.peer_connections = set() # uris with a running connect_to_peer, connected or retrying
+
+        # every connection broadcast goes to has its own send queue and writer task, so broadcast does not wait for slow peers
+        self.send_queues = {}       # {ws: asyncio.Queue}
+        self.send_tasks = {}        # {ws: writer task}
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout # s, a peer that takes longer to accept one message is disconnected
+        self.slow_peer_policy = slow_peer_policy # "disconnect" or "drop" when a peer's queue is full
         self.known_peers = {}       # {peer_id: {"uri": uri, "id": peer_id}}
 
+        # gossip overlay, with gossip_degree None every peer connects to every other one
+        self.gossip_degree = gossip_degree # outgoing connections kept to random known peers
+        self.gossip_ttl = gossip_ttl       # hops a broadcast message is relayed
+        self.seen_messages = OrderedDict() # ids of recent gossip messages
+        self.seen_messages_size = 100_000
+
+        # wire compression and encoding, offered in HANDSHAKE with the preferred one first
+        self.compressions = [] if compression is None else [compression] + [c for c in codec.supported_compressions() if c != compression]
+        if compression is not None and compression not in codec.supported_compressions():
+            raise ValueError(f"Unsupported compression {compression}")
+        # encoding None prefers msgpack when it is installed, JSON is always accepted
+        self.encodings = codec.supported_encodings() if encoding is None else [encoding] + [e for e in codec.supported_encodings() if e != encoding]
+        if encoding is not None and encoding not in codec.supported_encodings():
+            raise ValueError(f"Unsupported encoding {encoding}")
+        self.codecs = {}            # {ws: Codec} for connections that negotiated a compression or encoding
+        self.permessage_deflate = permessage_deflate # websocket level deflate, compresses every message
+
         self.consensus_threshold = 0.51  # 51% konsenzus
 
         # pending transactions mechanism
-        self.pending_transactions = deque()  # Queue of pending transactions
-        self.current_transaction = None      # Currently processing transaction
-        self.is_processing_transaction = False  # Flag to track if we are processing
+        self.pending_transactions = deque()  # client transactions waiting for their vote round
+        self.voting_transaction = None       # client transaction in its vote round, the previous one may still be mining
         self.pending_lock = asyncio.Lock()   # Thread safety for pending queue
 
         # transaction validation consensus
-        self.is_transaction_validation = False
-        self.transaction_votes = []
+        self.transaction_votes = {}  # {transaction_id: {peer_id: vote}}, votes may arrive before VERIFY_TRANSACTION
 
         # block validation consensus
         self.block_votes = []
@@ -44,88 +84,87 @@ class Peer:
         self.received_blocks = {}  # {timestamp: block} 
         self.consensus_finalized = False  
         self.block_processing_timeout = 2.0  # waiting for other blocks
+        self.block_round_active = False  # mining or block consensus for the next height in progress
+        self.finalize_task = None
+
+        # block assembly, mining waits up to the window (s) for more accepted transactions
+        self.block_assembly_window = block_assembly_window
+        self.block_assembly_transactions = self.chain.max_block_transactions
+        self.assembly_task = None
+        self.transaction_accepted = asyncio.Event()
 
         self.client_transactions = {}
 
+        # GET_BLOCKS replies stay under the default 1 MiB websocket message limit
+        self.sync_chunk_bytes = 512 * 1024
+
     async def add_pending_transaction(self, transaction_data, client_ws=None):
         
-        print(f"📋 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Add new transaction.")
+        self.log.info("Add new transaction.", icon="📋", tag="CLNT")
         
         if client_ws:
             transaction_id = Transaction.from_dict(transaction_data.get("transaction")).id
             self.client_transactions[transaction_id] = client_ws
-            print(f"💾 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Saved client connection for transaction {transaction_id}")
+            self.log.info("Saved client connection for transaction %s", transaction_id, icon="💾", tag="CLNT")
         
         async with self.pending_lock:
-            if not self.is_processing_transaction:
-                self.current_transaction = transaction_data
-                self.is_processing_transaction = True
-                print(f"⚡ [IMMEDIATE {util.get_current_time_precise()}] Peer {self.my_id}: Processing transaction immediately")
-                
-                await self._handle_add_transaction(transaction_data)
-            else:
-                self.pending_transactions.append(transaction_data)
-                print(f"📝 [QUEUE {util.get_current_time_precise()}] Peer {self.my_id}: Added transaction to pending queue. Queue size: {len(self.pending_transactions)}")
+            self.pending_transactions.append(transaction_data)
+            self.log.info("Added transaction to pending queue. Queue size: %s", len(self.pending_transactions), icon="📝", tag="QUEUE")
+
+        await self.process_next_transaction()
 
     async def process_next_transaction(self):
-        
+        # one vote round at a time, it does not wait for the previous transaction's block
         async with self.pending_lock:
-            if not self.pending_transactions:
+            if self.voting_transaction is not None or not self.pending_transactions:
                 return
             
+            self.voting_transaction = self.pending_transactions.popleft()
             
-            self.current_transaction = self.pending_transactions.popleft()
-            self.is_processing_transaction = True
-            
-        print(f"⚡ [PROCESSING {util.get_current_time_precise()}] Peer {self.my_id}: Started processing next transaction from queue. Remaining: {len(self.pending_transactions)}")
-        
+        self.log.info("Started processing next transaction from queue. Remaining: %s", len(self.pending_transactions), icon="⚡", tag="PROCESSING")
         
-        await self._handle_add_transaction(self.current_transaction)
+        await self._handle_add_transaction(self.voting_transaction)
 
-    async def transaction_completed(self):
+    async def voting_completed(self):
         
         async with self.pending_lock:
-            self.current_transaction = None
-            self.is_processing_transaction = False
+            self.voting_transaction = None
             
-        print(f"✅ [COMPLETED {util.get_current_time_precise()}] Peer {self.my_id}: Transaction processing completed.")
-        
-        # reset mining state
-        self.chain.can_mine = True
-        self.chain.is_mining = False
-        self.consensus_finalized = False
-        self.received_blocks.clear()
-        
+        self.log.info("Transaction vote round completed.", tag="COMPLETED")
         
         if self.pending_transactions:
-            print(f"🔄 [QUEUE {util.get_current_time_precise()}] Peer {self.my_id}: Processing next transaction from queue")
+            self.log.info("Processing next transaction from queue", icon="🔄", tag="QUEUE")
             await self.process_next_transaction()
 
     def get_pending_queue_status(self):
         
         return {
             "queue_size": len(self.pending_transactions),
-            "is_processing": self.is_processing_transaction,
-            "current_transaction_id": Transaction.from_dict(self.current_transaction.get("transaction")).id if self.current_transaction else None
+            "is_processing": self.voting_transaction is not None or self.block_round_active,
+            "current_transaction_id": self.voting_transaction.get("transaction", {}).get("id") if self.voting_transaction else None
         }
 
     async def send_message(self, ws, msg_type, data):
-        
-        try:
-            message = json.dumps({
-                "type": msg_type,
-                "data": data,
-                "sender_id": self.my_id
-            })
-            await ws.send(message)
-        except Exception as e:
-            # caller will handle cleanup of disconnected peers
-            raise
+        await self._write(ws, self._message(msg_type, data))
+
+    def _message(self, msg_type, data):
+        return {
+            "type": msg_type,
+            "data": data,
+            "sender_id": self.my_id
+        }
+
+    async def _write(self, ws, message):
+        # caller will handle cleanup of disconnected peers
+        await ws.send(self.codecs.get(ws, codec.PLAIN).encode(message))
 
     async def handle_message(self, ws, message):
        
         try:
-            msg = json.loads(message)
+            msg = self.codecs.get(ws, codec.PLAIN).decode(message)
+            if msg.get("gossip") is not None and not self._relay(ws, msg):
+                return
+
             msg_type = msg.get("type")
             data = msg.get("data")
             sender_id = msg.get("sender_id", "unknown")
@@ -134,13 +173,17 @@ class Peer:
                 case "HANDSHAKE":
                     await self._handle_handshake(ws, data)
                 case "HANDSHAKE_ACK":
-                    await self._handle_handshake_ack(data)
+                    await self._handle_handshake_ack(ws, data)
                 case "PEERS":
                     await self._handle_peers_list(sender_id, data)
                 case "GET_DATA":
                     await self._handle_get_data(ws)
                 case "RECEIVE_DATA":
                     await self._handle_receive_data(data)
+                case "GET_BLOCKS":
+                    await self._handle_get_blocks(ws, data)
+                case "GET_ACCOUNTS":
+                    await self._handle_get_accounts(ws, data)
                 case "ADD_ACCOUNT":
                     await self._handle_add_account(data)
 
@@ -155,6 +198,10 @@ class Peer:
                     await self._handle_get_queue_status(ws)
                 case "CLIENT_VERIFY_TRANSACTION":
                     await self._handle_client_verify_transaction(ws, data)
+                case "CLIENT_GET_PROOF":
+                    await self._handle_client_get_proof(ws, data)
+                case "CLIENT_GET_HEADER":
+                    await self._handle_client_get_header(ws, data)
                 case "CLIENT_GET_ALL_TRANSACTIONS_OF_PATIENT":
                     await self._handle_client_get_all_transactions_of_patient(ws, data)
 
@@ -171,55 +218,75 @@ class Peer:
                     await self._handle_final_block_consensus(data)
 
                 case _:
-                    print(f"⚠️ [WARN {util.get_current_time_precise()}] Peer {self.my_id}: Unknown message type: {msg_type}")
+                    self.log.warning("Unknown message type: %s", msg_type)
 
         except Exception as e:
-            print(f"⛔ [ERROR {util.get_current_time_precise()}] Peer {self.my_id}: handle_message: {e}")
+            self.log.error("handle_message: %s", e)
 
     async def _handle_client_get_all_transactions_of_patient(self,ws,data):
 
-        print(f"📋 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Get all transactions of patient.")
+        self.log.info("Get all transactions of patient.", icon="📋", tag="CLNT")
 
-        accounts = util.read_from_json_file(f"./blockchain/db/{str(self.port)}_accounts.json")
-
-        if not any(acc["public_key"]== data for acc in accounts):
-            print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Get all transactions of patient complited.")
+        if not self.accounts.contains(data):
+            self.log.info("Get all transactions of patient complited.")
             return await ws.send(json.dumps({"message": "Account does not exist!"}))
         
-        print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Get all transactions of patient complited.")
+        self.log.info("Get all transactions of patient complited.")
         return await ws.send(json.dumps({"message":self.chain.find_all_transactions_with_public_key(data)}))
 
     async def _handle_client_verify_transaction(self,ws, data):
-        print(f"📋 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Verify transaction.")
+        self.log.info("Verify transaction.", icon="📋", tag="CLNT")
 
         health_record_hash = self.chain.find_health_record(data["health_record_id"])
         if health_record_hash == None:
-            print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Verification complited.")
+            self.log.info("Verification complited.")
             return await ws.send(json.dumps({"message":"Health record does not exist!"}))
 
         if util.hash256(data["health_record"]) == health_record_hash:
-            print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Verification complited.")
+            self.log.info("Verification complited.")
             return await ws.send(json.dumps({"message":"Health record is valid!"}))
         else:
-            print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Verification complited.")
+            self.log.info("Verification complited.")
             return await ws.send(json.dumps({"message":"Health record is invalid!"}))
 
 
+    async def _handle_client_get_proof(self, ws, data):
+        self.log.info("Get proof.", icon="📋", tag="CLNT")
+
+        proof = self.chain.get_health_record_proof(data["health_record_id"])
+        if proof is None:
+            self.log.info("Get proof complited.")
+            return await ws.send(json.dumps({"message":"Health record does not exist!"}))
+
+        self.log.info("Get proof complited.")
+        return await ws.send(json.dumps({"message":proof}))
+
+    async def _handle_client_get_header(self, ws, data):
+        self.log.info("Get header.", icon="📋", tag="CLNT")
+
+        height = data.get("height")
+        if not isinstance(height, int) or height < 0 or height >= len(self.chain.chain):
+            self.log.info("Get header complited.")
+            return await ws.send(json.dumps({"message":"Block does not exist!"}))
+
+        self.log.info("Get header complited.")
+        return await ws.send(json.dumps({"message":self.chain.chain[height].header.to_dict()}))
+
     async def _handle_client_add_account(self,ws, data):
-        print(f"📋 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Add account.")
+        self.log.info("Add account.", icon="📋", tag="CLNT")
         new_account = {
             "public_key": data["public_key"],
             "private_key": data["private_key"]  
         }
-        Account._add_new_account_to_db(new_account,self.port)
-        print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Account added.")
+        self.accounts.add(new_account)
+        self.log.info("Account added.")
         await ws.send(json.dumps({"message":"Account added!"}))
         await self.broadcast("ADD_ACCOUNT",new_account)
     
     async def _handle_add_account(self, data):
-        print(f"📋 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: Add account")
-        Account._add_new_account_to_db(data,self.port)
-        print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Account added.")
+        self.log.info("Add account", icon="📋", tag="RECV")
+        self.accounts.add(data)
+        self.log.info("Account added.")
 
     async def notify_client_transaction_result(self, transaction_id, success, message):
        
@@ -234,48 +301,131 @@ class Peer:
                     "timestamp": util.get_current_time_precise()
                 }
                 await client_ws.send(json.dumps(response))
-                print(f"📤 [CLNT {util.get_current_time_precise()}] Peer {self.my_id}: Sent result to client for transaction {transaction_id}: {message}")
+                self.log.info("Sent result to client for transaction %s: %s", transaction_id, message, icon="📤", tag="CLNT")
             except Exception as e:
-                print(f"⛔ [ERROR {util.get_current_time_precise()}] Failed to notify client for transaction {transaction_id}: {e}")
+                self.log.error("Failed to notify client for transaction %s: %s", transaction_id, e)
             finally:
                 
                 del self.client_transactions[transaction_id]
 
     async def load_data_from_peer(self, uri):
-        print(f"✉️ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Requesting data from {uri}")
+        self.log.info("Requesting data from %s", uri, icon="✉️")
 
-        ws = await websockets.connect(uri)
+        ws = await websockets.connect(uri, compression=self._websocket_compression())
         try:
-            
-            await self.send_message(ws, "GET_DATA", {})
-            
-            
-            while True:
-                message = await ws.recv()
-                data = json.loads(message)  
-                
-                msg_type = data.get("type")
-                msg_data = data.get("data", {})
-                
-                if msg_type == "RECEIVE_DATA":
-                    await self._handle_receive_data(msg_data)
-                    break  
+            # no uri, the sync connection only negotiates the codec and does not join the network
+            ack = await self._request(ws, "HANDSHAKE", {"peer_id": self.my_id, "compression": self.compressions, "encoding": self.encodings}, "HANDSHAKE_ACK")
+            self._set_codec(ws, ack.get("compression"), ack.get("encoding"))
+
+            accounts = self.accounts.to_list()
+            data = await self._request(ws, "GET_ACCOUNTS", {
+                "since": len(accounts),
+                "last_public_key": accounts[-1].get("public_key") if accounts else None
+            }, "ACCOUNTS")
+            added = self.accounts.extend(data["accounts"])
+            self.log.info("%s new accounts from peer.", added, icon="🔄", tag="RECV")
+
+            if await self._stream_blocks(ws) is False:
+                self.log.info("No common chain with %s, requesting full chain.", uri, icon="🔄")
+                await self._handle_receive_data(await self._request(ws, "GET_DATA", {}, "RECEIVE_DATA"))
                     
         except Exception as e:
-            print(f"❌ [INFO] Peer {self.my_id}: Greška pri učitavanju chain-a: {e}")
+            self.log.error("Greška pri učitavanju chain-a: %s", e, icon="❌")
         finally:
+            self.codecs.pop(ws, None)
             await ws.close()
 
+    async def _request(self, ws, msg_type, data, reply_type):
+        await self.send_message(ws, msg_type, data)
+        while True:
+            message = self.codecs.get(ws, codec.PLAIN).decode(await ws.recv())
+            if message.get("type") == reply_type:
+                return message.get("data", {})
+
+    async def _stream_blocks(self, ws):
+        # Pulls the chain in bounded chunks, one request in flight. Every chunk starts
+        # with our last block so the peer's copy of it can be compared, and is
+        # persisted before the next one is requested, so an interrupted sync resumes
+        # from the local height. False when not even the genesis block matches.
+        height = self.chain.get_last_block().header.height
+        data = await self._request(ws, "GET_BLOCKS", {"from_height": height}, "BLOCKS")
+
+        if self._continues_chain(data) is False:
+            local_height = height
+            height = await self._find_common_ancestor(ws, min(height, data.get("height", 0)))
+            if height is None:
+                return False
+
+            # every block of the peer is ours, it is only behind
+            if height == data.get("height", 0) and height < local_height:
+                self.log.info("Peer is behind at block #%s, keeping the local chain.", height, icon="🔄")
+                return True
+
+            self.log.info("Switching to peer's fork after block #%s.", height, icon="🔄")
+            self.chain.truncate(height)
+            data = await self._request(ws, "GET_BLOCKS", {"from_height": height}, "BLOCKS")
+
+        while True:
+            blocks = data.get("blocks", [])
+            if self._continues_chain(data) is False or self.chain.extend_from_dict(blocks[1:]) is False:
+                raise ValueError(f"invalid chunk from block #{data.get('from_height')}")
+
+            height = self.chain.get_last_block().header.height
+            self.log.info("Synced to block #%s of %s.", height, data.get("height"), icon="🔄", tag="RECV")
+            if height >= data.get("height", 0):
+                return True
+
+            data = await self._request(ws, "GET_BLOCKS", {"from_height": height}, "BLOCKS")
+
+    def _continues_chain(self, data):
+        blocks = data.get("blocks", [])
+        last_block = self.chain.get_last_block()
+        return bool(blocks) and blocks[0]["header"]["height"] == last_block.header.height and blocks[0]["header"]["block_hash"] == last_block.header.block_hash
+
+    async def _find_common_ancestor(self, ws, high):
+        # highest height where both chains have the same block, binary search over single-block requests
+        async def matches(height):
+            data = await self._request(ws, "GET_BLOCKS", {"from_height": height, "to_height": height}, "BLOCKS")
+            blocks = data.get("blocks", [])
+            return bool(blocks) and blocks[0]["header"]["block_hash"] == self.chain.chain[height].header.block_hash
+
+        if await matches(0) is False:
+            return None
+
+        low = 0
+        while low < high:
+            middle = (low + high + 1) // 2
+            if await matches(middle):
+                low = middle
+            else:
+                high = middle - 1
+
+        return low
+
     async def _handle_get_data(self, ws):
-        print(f"📩 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: Sending data to new peer.")
-        accounts = util.read_from_json_file(f"./blockchain/db/{self.port}_accounts.json")
-        await self.send_message(ws, "RECEIVE_DATA",{"chain":self.chain.chain_to_dict(),"accounts":accounts})
+        self.log.info("Sending data to new peer.", icon="📩", tag="RECV")
+        await self.send_message(ws, "RECEIVE_DATA",{"chain":self.chain.chain_to_dict(),"accounts":self.accounts.to_list()})
+
+    async def _handle_get_blocks(self, ws, data):
+        from_height = data.get("from_height", 0)
+        to_height = data.get("to_height")
+        blocks = self.chain.get_blocks(from_height, to_height, self.sync_chunk_bytes)
+        self.log.info("Sending %s blocks from #%s.", len(blocks), from_height, icon="📩", tag="RECV")
+        await self.send_message(ws, "BLOCKS", {
+            "from_height": from_height,
+            "height": self.chain.get_last_block().header.height,
+            "blocks": blocks
+        })
+
+    async def _handle_get_accounts(self, ws, data):
+        since, accounts = self.accounts.since(data.get("since", 0), data.get("last_public_key"))
+        await self.send_message(ws, "ACCOUNTS", {"since": since, "count": len(self.accounts), "accounts": accounts})
 
     async def _handle_receive_data(self, data):
-        print(f"🔄 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: Loading data from peer.")
+        self.log.info("Loading data from peer.", icon="🔄", tag="RECV")
         chain_dict = data["chain"]
         self.chain.chain_from_dict(chain_dict)
-        util.write_to_json_file(f"./blockchain/db/{self.port}_accounts.json",data["accounts"])
+        self.accounts.replace(data["accounts"])
        
 
     async def _handle_get_queue_status(self, ws):
@@ -285,65 +435,72 @@ class Peer:
 
     async def _handle_add_transaction(self, data):
        
-        print(f"🆕 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Handling new transaction from client.")
-        
-        self.is_transaction_validation = True
-        self.transaction_votes = []
-
+        self.log.info("Handling new transaction from client.", icon="🆕")
         
         await self.broadcast("VERIFY_TRANSACTION", data)
 
         # local validation and vote
-        transaction_vote = {"id": self.my_id, "vote": self.verify_transaction(data)}
-        self.transaction_votes.append(transaction_vote)
+        await self._vote(data)
+
+    async def _vote(self, data):
+        transaction_vote = {
+            "id": self.my_id,
+            "transaction_id": data.get("transaction", {}).get("id"),
+            "vote": self.verify_transaction(data)
+        }
+        self._handle_transactin_vote(transaction_vote)
         await self.broadcast("TRANSACTION_VOTE", transaction_vote)
 
     def verify_transaction(self, data):
-        self.is_transaction_validation = True
         health_record = data.get("data_for_validation")
         transaction = Transaction.from_dict(data.get("transaction"))
 
         is_valid = False
         
         if self.chain.add_transaction(transaction, health_record):
-            print(f"\n✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Transaction {transaction.id} is valid.")
+            self.log.info("Transaction %s is valid.", transaction.id)
             is_valid = True
         else:
-            print(f"\n❌ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Transaction {transaction.id} is invalid!")
+            self.log.warning("Transaction %s is invalid!", transaction.id, icon="❌")
             is_valid = False
 
         return is_valid
 
     async def _handle_verify_transaction(self, data):
         
-        print(f"🔍 [RECV {util.get_current_time_precise()}]  Peer {self.my_id}: Transaction for validation {Transaction.from_dict(data.get('transaction')).id}")
-
-        
-        self.is_transaction_validation = True
-        self.transaction_votes = []
+        self.log.info("Transaction for validation %s", data.get("transaction", {}).get("id"), icon="🔍", tag="RECV")
 
-        transaction_vote = {"id": self.my_id, "vote": self.verify_transaction(data)}
-        self.transaction_votes.append(transaction_vote)
-        await self.broadcast("TRANSACTION_VOTE", transaction_vote)
+        await self._vote(data)
 
     def _handle_transactin_vote(self, data):
-        self.transaction_votes.append(data)
+        transaction_id = data.get("transaction_id")
+        votes = self.transaction_votes.setdefault(transaction_id, {})
+        votes[data.get("id")] = data.get("vote")
+
+        # consensus moves on as soon as the last vote arrives, ours included
+        if self.my_id in votes and len(votes) >= self.get_network_size():
+            del self.transaction_votes[transaction_id]
+            self._check_transaction_consensus(transaction_id, votes)
 
     async def _handle_verify_block(self, data, sender_id):
         async with self.block_consensus_lock:
             if self.consensus_finalized:
-                print(f"  [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Consensus over, ignore block from {sender_id}")
+                self.log.info("Consensus over, ignore block from %s", sender_id)
+                return
+
+            temp_block = Block.from_dict(data)
+            if temp_block.header.height != self.chain.get_last_block().header.height + 1:
+                self.log.info("Ignore block #%s from %s, not the next height", temp_block.header.height, sender_id)
                 return
 
             # Stop mining on all peers
             self.chain.can_mine = False
             self.chain.is_mining = False
 
-            print(f"📩 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: Recived block for validation from {sender_id} peer.")
-            temp_block = Block.from_dict(data)
+            self.log.info("Recived block for validation from %s peer.", sender_id, icon="📩", tag="RECV")
             timestamp = temp_block.header.timestamp
 
-            print(f"📦 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Peer {temp_block.header.miner} mined block at {timestamp}.")
+            self.log.info("Peer %s mined block at %s.", temp_block.header.miner, timestamp, icon="📦")
 
             # add recived block to collection
             # if block with same timestamp exitst in collection, ignore duplicate
@@ -354,15 +511,17 @@ class Peer:
                 }
 
             
-            if self.chain.mined_block is not None and self.chain.mined_block.header.timestamp not in self.received_blocks:
+            if self.chain.mined_block is not None and self.chain.mined_block.is_solved() and self.chain.mined_block.header.timestamp not in self.received_blocks:
                 our_timestamp = self.chain.mined_block.header.timestamp
                 self.received_blocks[our_timestamp] = {
                     "block": self.chain.mined_block,
                     "sender": self.my_id
                 }
-                print(f"📦 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Added our block mined at {our_timestamp}.")
+                self.log.info("Added our block mined at %s.", our_timestamp, icon="📦")
 
-            asyncio.create_task(self._finalize_consensus_after_timeout())
+            # one timer per round, started by the first block
+            if self.finalize_task is None:
+                self.finalize_task = asyncio.create_task(self._finalize_consensus_after_timeout())
 
     async def _finalize_consensus_after_timeout(self):
         
@@ -372,13 +531,11 @@ class Peer:
             if self.consensus_finalized:
                 return  
             if not self.received_blocks:
-                print(f"  [INFO {util.get_current_time_precise()}] Peer {self.my_id}: No blocks for consensus.")
-                
-                self.chain.can_mine = True
-                self.chain.is_mining = False
+                self.log.info("No blocks for consensus.")
+                self._end_block_round()
                 return
 
-            print(f"🔚 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Finalizing consensus with {len(self.received_blocks)} blocks.")
+            self.log.info("Finalizing consensus with %s blocks.", len(self.received_blocks), icon="🔚")
 
             # sort blocks by timestamp (oldest wins)
             sorted_timestamps = sorted(self.received_blocks.keys())
@@ -387,7 +544,7 @@ class Peer:
             winning_block = winning_block_info["block"]
             winning_sender = winning_block_info["sender"]
 
-            print(f"🏆 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: WINNER block mined at {winning_timestamp} by {winning_sender} peer.")
+            self.log.info("WINNER block mined at %s by %s peer.", winning_timestamp, winning_sender, icon="🏆")
 
             # set final block
             self.mined_block = winning_block
@@ -401,23 +558,19 @@ class Peer:
                 "finalizer": self.my_id
             })
 
-            print(f"🎯 [INFO {util.get_current_time_precise()}] Peer {self.my_id}:  Consensus finalized. Blok mined at {winning_timestamp} by {winning_sender}")
+            self.log.info("Consensus finalized. Blok mined at %s by %s", winning_timestamp, winning_sender, icon="🎯")
 
             try:
-                if Block.is_valid(self.mined_block, self.chain):
-                    
-                    # NOVO: Završi transakciju samo ako je ovo node koji je kopao blok
-                    if winning_sender == self.my_id and self.is_processing_transaction:
-                        print(f"🎯 [MINE SUCCESS {util.get_current_time_precise()}] Peer {self.my_id}: My block won consensus!")
-                        asyncio.create_task(self.transaction_completed())
+                if winning_sender == self.my_id:
+                    self.log.info("My block won consensus!", icon="🎯", tag="MINE SUCCESS")
+
+                # the finalizer does not get its own FINAL_BLOCK_CONSENSUS
+                self._add_final_block(winning_block)
             except Exception as e:
-                print(f"⛔ [ERROR {util.get_current_time_precise()}] Peer {self.my_id}: While adding block to chain: {e}")
+                self.log.error("While adding block to chain: %s", e)
 
             
-            self.reset_block_consensus()
-            self.chain.can_mine = True
-            self.chain.is_mining = False
-            self.chain.mined_block = None
+            self._end_block_round()
 
     async def _handle_final_block_consensus(self, data):
         async with self.block_consensus_lock:
@@ -425,66 +578,103 @@ class Peer:
                 return
 
             winning_block = Block.from_dict(data.get("winning_block"))
+            if winning_block.header.height != self.chain.get_last_block().header.height + 1:
+                # another finalizer's message for a round we already closed
+                return
+
             winning_sender = data.get("winning_sender")
             finalizer = data.get("finalizer")
             total_blocks = data.get("total_blocks")
 
-            print(f"🏆 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: Recived FINAL consensus from {finalizer}, total blocks in consensus {total_blocks}.")
+            self.log.info("Recived FINAL consensus from %s, total blocks in consensus %s.", finalizer, total_blocks, icon="🏆", tag="RECV")
             self.mined_block = winning_block
             self.consensus_finalized = True
 
             try:
-                if self.chain.get_last_block().header.height != self.mined_block.header.height:
-                    if Block.is_valid(self.mined_block, self.chain):
-                        self.chain.add_to_block_to_chain(self.mined_block)
-                        print(f"✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Final block added to chain:")
-                        print(self.mined_block.header)
-                        
-                        
-                        if self.current_transaction:
-                            current_transaction_id = Transaction.from_dict(self.current_transaction.get("transaction")).id
-                            asyncio.create_task(self.notify_client_transaction_result(
-                                current_transaction_id,
-                                True,
-                                f"Transaction successfully added to blockchain in block {winning_block.header.height}"
-                            ))
-                        
-                        asyncio.create_task(self.transaction_completed())
+                self._add_final_block(winning_block)
             except Exception as e:
-                print(f"⛔ [ERROR {util.get_current_time_precise()}] Peer {self.my_id}: While addding winning block to local chain: {e}")
+                self.log.error("While addding winning block to local chain: %s", e)
                 
-               
-                if self.current_transaction:
-                    current_transaction_id = Transaction.from_dict(self.current_transaction.get("transaction")).id
-                    asyncio.create_task(self.notify_client_transaction_result(
-                        current_transaction_id,
-                        False,
-                        f"Error adding transaction to blockchain: {str(e)}"
-                    ))
-
-            # reset state
-            self.reset_block_consensus()
-            self.chain.can_mine = True
-            self.chain.is_mining = False
-            self.chain.mined_block = None
-            self.is_transaction_validation = False
-            self.transaction_votes = []
+                for transaction in winning_block.transactions:
+                    if transaction.id in self.client_transactions:
+                        asyncio.create_task(self.notify_client_transaction_result(
+                            transaction.id,
+                            False,
+                            f"Error adding transaction to blockchain: {str(e)}"
+                        ))
+
+            self._end_block_round()
+
+    def _add_final_block(self, winning_block):
+        if self.chain.get_last_block().header.height != winning_block.header.height:
+            if Block.is_valid(winning_block, self.chain):
+                self.chain.add_to_block_to_chain(winning_block)
+                self.log.info("Final block #%s added to chain.", winning_block.header.height)
+                self.log.debug("Final block header: %s", winning_block.header)
+                
+                for transaction in winning_block.transactions:
+                    if transaction.id in self.client_transactions:
+                        asyncio.create_task(self.notify_client_transaction_result(
+                            transaction.id,
+                            True,
+                            f"Transaction successfully added to blockchain in block {winning_block.header.height}"
+                        ))
+
+    def _end_block_round(self):
+        # mining of the next block starts right away if accepted transactions are left
+        if self.finalize_task is not None and self.finalize_task is not asyncio.current_task():
+            self.finalize_task.cancel()
+        self.finalize_task = None
+        if self.assembly_task is not None:
+            self.assembly_task.cancel()
+            self.assembly_task = None
+
+        self.reset_block_consensus()
+        self.chain.can_mine = True
+        self.chain.is_mining = False
+        self.chain.mined_block = None
+        self.block_round_active = False
+
+        self._mine_if_idle()
 
     async def _handle_handshake(self, ws, data):
         
         peer_id = data.get("peer_id")
         peer_uri = data.get("uri")
-        print(f"🤝 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: HANDSHAKE from {peer_id} ({peer_uri})")
+        self.log.info("HANDSHAKE from %s (%s)", peer_id, peer_uri, icon="🤝", tag="RECV")
 
-        
-        self.incoming_peers[ws] = {"id": peer_id, "uri": peer_uri}
-        self.known_peers[peer_id] = {"uri": peer_uri, "id": peer_id}
+        is_new_peer = peer_id not in self.known_peers
+        if peer_uri is not None:
+            self.incoming_peers[ws] = {"id": peer_id, "uri": peer_uri}
+            self.known_peers[peer_id] = {"uri": peer_uri, "id": peer_id}
 
-        
+        # older peers do not send compression or encoding and get plain JSON
+        compression = codec.negotiate(data.get("compression"), self.compressions)
+        encoding = codec.negotiate(data.get("encoding"), self.encodings)
         await self.send_message(ws, "HANDSHAKE_ACK", {
             "peer_id": self.my_id,
-            "uri": self.my_uri
+            "uri": self.my_uri,
+            "compression": compression,
+            "encoding": encoding
         })
+        self._set_codec(ws, compression, encoding)
+
+        if self.gossip_degree is not None and peer_uri is not None:
+            # gossip goes both ways, a peer that no one else connects to is reached over its own connections
+            self._open_send_queue(ws)
+            self._enqueue(ws, self._message("PEERS", self._peer_list()))
+            if is_new_peer:
+                await self.broadcast("PEERS", [{"uri": peer_uri, "id": peer_id}])
+
+    def _set_codec(self, ws, compression, encoding):
+        compression = compression if compression in self.compressions else None
+        encoding = encoding if encoding in self.encodings else "json"
+        if compression is not None or encoding != "json":
+            self.codecs[ws] = codec.Codec(compression, encoding=encoding)
+            self.log.info("Using %s encoding, %s compression.", encoding, compression, icon="🗜️")
+
+    def _websocket_compression(self):
+        return "deflate" if self.permessage_deflate else None
 
     async def _handle_client_get_chain(self, ws):
 
@@ -492,26 +682,74 @@ class Peer:
         for block in self.chain.chain:
             response["chain"].append(block.to_dict())
 
-        await ws.send(json.dumps(response, indent=4))
+        # compact, indentation made the chain about a third larger
+        await ws.send(json.dumps(response))
 
-    async def _handle_handshake_ack(self, data):
+    async def _handle_handshake_ack(self, ws, data):
         
         peer_id = data.get("peer_id")
         peer_uri = data.get("uri")
-        print(f"🤝 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: HANDSHAKE_ACK from {peer_id} ({peer_uri})")
+        self.log.info("HANDSHAKE_ACK from %s (%s)", peer_id, peer_uri, icon="🤝", tag="RECV")
         self.known_peers[peer_id] = {"uri": peer_uri, "id": peer_id}
+        self._set_codec(ws, data.get("compression"), data.get("encoding"))
 
     async def _handle_peers_list(self, sender_id, data):
         
-        print(f"📋 [RECV {util.get_current_time_precise()}] Peer {self.my_id}: PEERS list from {sender_id}: {data}\n")
+        self.log.debug("PEERS list from %s: %s", sender_id, data, icon="📋", tag="RECV")
         for peer_info in data:
             peer_uri = peer_info.get("uri")
             peer_id = peer_info.get("id")
-            if (peer_uri != self.my_uri and 
-                peer_uri not in self.outgoing_peers and 
-                peer_id != self.my_id):
+            if peer_uri == self.my_uri or peer_id == self.my_id:
+                continue
+
+            if self.gossip_degree is not None:
+                # every peer counts for the votes, only gossip_degree of them are connected to
+                self.known_peers.setdefault(peer_id, {"uri": peer_uri, "id": peer_id})
+            elif peer_uri not in self.outgoing_peers:
                 asyncio.create_task(self.connect_to_peer(peer_uri))
 
+        self._fill_gossip_degree()
+
+    def _peer_list(self):
+        peer_list = [{"uri": info["uri"], "id": info["id"]} for info in self.known_peers.values()]
+        peer_list.append({"uri": self.my_uri, "id": self.my_id})  # dodaj sebe
+        return peer_list
+
+    def _fill_gossip_degree(self):
+        if self.gossip_degree is None:
+            return
+
+        candidates = [info["uri"] for info in self.known_peers.values() if info["uri"] not in self.peer_connections]
+        random.shuffle(candidates)
+        for uri in candidates[:max(0, self.gossip_degree - len(self.peer_connections))]:
+            # registered before the task runs, so the next call does not pick it again
+            self.peer_connections.add(uri)
+            asyncio.create_task(self._connection_loop(uri))
+
+    def _relay(self, ws, msg):
+        # False for a gossip message seen before, a new one is passed on to the other neighbours until its ttl runs out
+        gossip = msg["gossip"]
+        if not self._first_seen(gossip.get("id")):
+            return False
+
+        if gossip.get("ttl", 0) > 1:
+            relayed = dict(msg, gossip={"id": gossip["id"], "ttl": gossip["ttl"] - 1})
+            for neighbour in list(self.send_queues):
+                if neighbour is not ws:
+                    self._enqueue(neighbour, relayed)
+
+        return True
+
+    def _first_seen(self, msg_id):
+        if msg_id in self.seen_messages:
+            return False
+
+        self.seen_messages[msg_id] = True
+        if len(self.seen_messages) > self.seen_messages_size:
+            self.seen_messages.popitem(last=False)
+
+        return True
+
     def get_network_size(self):
         return len(self.known_peers) + 1  # +1 for self
 
@@ -519,48 +757,116 @@ class Peer:
         network_size = self.get_network_size()
         return int(network_size * self.consensus_threshold) + 1
 
-    def _check_transaction_consensus(self):
+    def _check_transaction_consensus(self, transaction_id, votes):
         required_votes = self.calculate_required_votes()
 
-        print(f"🗳️ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Required {str(required_votes)} voices.")
-
-        def izdvoji_po_validnosti(lista):
-            validne = [item for item in lista if item.get("vote") is True]
-            nevalidne = [item for item in lista if item.get("vote") is False]
-            return validne, nevalidne
+        self.log.info("Required %s voices.", required_votes, icon="🗳️")
 
-        positive_votes, negative_votes = izdvoji_po_validnosti(self.transaction_votes)
-        
-        current_transaction_id = None
-        if self.current_transaction:
-            current_transaction_id = Transaction.from_dict(self.current_transaction.get("transaction")).id
+        positive_votes = [vote for vote in votes.values() if vote is True]
 
         if len(positive_votes) >= required_votes:
-            print(f"👥✅ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Transaction ACCEPTED by consensus")
-            
-            print(f"\n⛏️ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Mining started.")
-            
-            self.chain.can_mine = True
-            self.chain.is_mining = True
-            self.consensus_finalized = False
-            
-            mining_thread = threading.Thread(target=self.chain.create_new_block, daemon=True)
-            mining_thread.start()
+            self.log.info("Transaction %s ACCEPTED by consensus", transaction_id, icon="👥✅")
+            self.chain.accept_transaction(transaction_id)
+            self.transaction_accepted.set()
+            self._mine_if_idle()
 
         else:
-            print(f"👥❌ [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Transaction REJECTED by consensus")
+            self.log.info("Transaction %s REJECTED by consensus", transaction_id, icon="👥❌")
+
+            # peers that voted for it must not mine it into a later block
+            self.chain.remove_transactions([transaction_id])
             
-            if current_transaction_id:
+            if transaction_id in self.client_transactions:
                 asyncio.create_task(self.notify_client_transaction_result(
-                    current_transaction_id, 
+                    transaction_id, 
                     False, 
                     f"Transaction rejected by network consensus. Positive votes: {len(positive_votes)}, Required: {required_votes}"
                 ))
-            
-            asyncio.create_task(self.transaction_completed())
 
-        self.is_transaction_validation = False
-        self.transaction_votes = []
+        # the next client transaction is voted on while this one is mined
+        if self.voting_transaction is not None and self.voting_transaction.get("transaction", {}).get("id") == transaction_id:
+            asyncio.create_task(self.voting_completed())
+
+    def _mine_if_idle(self):
+        # one block round at a time, a round takes every transaction accepted so far
+        if self.block_round_active or self.received_blocks or not self.chain.has_accepted_transactions():
+            return
+
+        self.block_round_active = True
+        self.assembly_task = asyncio.create_task(self._assemble_block())
+
+    async def _assemble_block(self):
+        # a burst of transactions shares one block and one consensus round
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_assembly_window
+        while self.chain.mempool.accepted_count() < self.block_assembly_transactions:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            self.transaction_accepted.clear()
+            try:
+                await asyncio.wait_for(self.transaction_accepted.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        self.assembly_task = None
+
+        # a block from another peer ends this round
+        if self.received_blocks:
+            return
+        if not self.chain.has_accepted_transactions():
+            self.block_round_active = False
+            return
+
+        self.log.info("Mining started with %s transactions.", min(self.chain.mempool.accepted_count(), self.chain.max_block_transactions), icon="⛏️")
+
+        self.chain.can_mine = True
+        self.chain.is_mining = True
+        self.consensus_finalized = False
+
+        self._start_mining()
+
+    def _start_mining(self):
+        # the mining thread hands the block back to the event loop through a future,
+        # transactions are selected here because the event loop keeps changing the mempool
+        loop = asyncio.get_running_loop()
+        mined = loop.create_future()
+        block = self.chain.prepare_block()
+
+        def mine():
+            try:
+                self.chain.mine_block(block)
+            except Exception as e:
+                loop.call_soon_threadsafe(mined.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(mined.set_result, block)
+
+        threading.Thread(target=mine, daemon=True).start()
+        asyncio.create_task(self._send_mined_block(mined))
+
+    async def _send_mined_block(self, mined):
+        try:
+            block = await mined
+        except Exception as e:
+            self.log.error("Mining failed: %s", e)
+            self.chain.is_mining = False
+            self.chain.mined_block = None
+            # blocks from other peers finish the round themselves, otherwise start a new one
+            if not self.received_blocks:
+                self._end_block_round()
+            return
+
+        # mining was stopped by a block from another peer
+        if not self.chain.is_mining or self.consensus_finalized or self.chain.mined_block is not block:
+            return
+        if block.header.height != self.chain.get_last_block().header.height + 1:
+            return
+
+        # stop mining locally
+        self.chain.is_mining = False
+
+        self.log.info("Sending mined block to consensus.", icon="📤")
+        await self.broadcast("VERIFY_BLOCK", block.to_dict())
 
     def reset_block_consensus(self):
        
@@ -576,9 +882,11 @@ class Peer:
                     await self.handle_message(ws, message)
             finally:
                 # Cleanup 
+                self._close_send_queue(ws)
+                self.codecs.pop(ws, None)
                 if ws in self.incoming_peers:
                     peer_info = self.incoming_peers[ws]
-                    print(f"  [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Incoming peer {peer_info['id']} disconnected.")
+                    self.log.info("Incoming peer %s disconnected.", peer_info["id"])
                     del self.incoming_peers[ws]
                 
                 to_remove = []
@@ -587,105 +895,154 @@ class Peer:
                         to_remove.append(transaction_id)
                 
                 for transaction_id in to_remove:
-                    print(f"🧹 [CLEANUP {util.get_current_time_precise()}] Peer {self.my_id}: Removing disconnected client transaction {transaction_id}")
+                    self.log.info("Removing disconnected client transaction %s", transaction_id, icon="🧹", tag="CLEANUP")
                     del self.client_transactions[transaction_id]
 
-        print(f"🚀 PEER {self.my_id} started on {self.my_uri} at {util.get_current_time_precise()}...\n")
+        self.log.info("Started on %s", self.my_uri, icon="🚀")
 
-        return await websockets.serve(handler, "localhost", self.port)
+        return await websockets.serve(handler, "localhost", self.port, compression=self._websocket_compression())
 
     async def connect_to_peer(self, uri):
         
-        if uri == self.my_uri or uri in self.outgoing_peers:
+        if uri == self.my_uri or uri in self.outgoing_peers or uri in self.peer_connections:
             return
 
+        self.peer_connections.add(uri)
+        await self._connection_loop(uri)
+
+    async def _connection_loop(self, uri):
         retry_count = 0
         max_retries = 3
 
-        while retry_count < max_retries:
-            try:
-                print(f"🔄 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Trying to connect to {uri} (attempt {retry_count + 1})")
-                ws = await websockets.connect(uri)
-                self.outgoing_peers[uri] = ws
-                print(f"🔗 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Connected to {uri}")
+        try:
+            while retry_count < max_retries:
+                try:
+                    self.log.info("Trying to connect to %s (attempt %s)", uri, retry_count + 1, icon="🔄")
+                    ws = await websockets.connect(uri, compression=self._websocket_compression())
+                    self.outgoing_peers[uri] = ws
+                    self._open_send_queue(ws)
+                    self.log.info("Connected to %s", uri, icon="🔗")
+
+                    # queued before any broadcast, the handshake is always the first message
+                    self._enqueue(ws, self._message("HANDSHAKE", {
+                        "peer_id": self.my_id,
+                        "uri": self.my_uri,
+                        "compression": self.compressions,
+                        "encoding": self.encodings
+                    }))
+
+                    self._enqueue(ws, self._message("PEERS", self._peer_list()))
+
+                    async for message in ws:
+                        await self.handle_message(ws, message)
+
+                except Exception as e:
+                    self.log.warning("Cannot connect to %s: %s", uri, e)
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        await asyncio.sleep(2)
+                    else:
+                        self.log.error("Falied to connect to %s after %s tries.", uri, max_retries)
+                        break
+                finally:
+                    # Cleanup
+                    if uri in self.outgoing_peers:
+                        try:
+                            ws = self.outgoing_peers[uri]
+                            self._close_send_queue(ws)
+                            self.codecs.pop(ws, None)
+                            await ws.close()
+                        except Exception:
+                            pass
+                        del self.outgoing_peers[uri]
+        finally:
+            self.peer_connections.discard(uri)
 
-                
-                await self.send_message(ws, "HANDSHAKE", {
-                    "peer_id": self.my_id,
-                    "uri": self.my_uri
-                })
+        # a gossip peer that is gone for good is replaced by another known peer
+        self._fill_gossip_degree()
 
-               
-                peer_list = [{"uri": info["uri"], "id": info["id"]} for info in self.known_peers.values()]
-                peer_list.append({"uri": self.my_uri, "id": self.my_id})  # dodaj sebe
-                await self.send_message(ws, "PEERS", peer_list)
+    async def broadcast(self, msg_type, data):
+        # only queues the message, every peer's writer task sends it on its own
+        message = self._message(msg_type, data)
+        if self.gossip_degree is not None:
+            message["gossip"] = {"id": uuid.uuid4().hex, "ttl": self.gossip_ttl}
+            self._first_seen(message["gossip"]["id"])
 
-                async for message in ws:
-                    await self.handle_message(ws, message)
+        queued = 0
+        for ws in list(self.send_queues):
+            if self._enqueue(ws, message):
+                queued += 1
 
-            except Exception as e:
-                print(f"⚠️ [WARN {util.get_current_time_precise()}] Peer {self.my_id}: Cannot connect to {uri}: {e}")
-                retry_count += 1
-                if retry_count < max_retries:
-                    await asyncio.sleep(2)
-                else:
-                    print(f"⛔ [ERROR {util.get_current_time_precise()}] Peer {self.my_id}: Falied to connect to {uri} after {max_retries} tries.")
-                    break
-            finally:
-                # Cleanup
-                if uri in self.outgoing_peers:
-                    try:
-                        ws = self.outgoing_peers[uri]
-                        await ws.close()
-                    except Exception:
-                        pass
-                    del self.outgoing_peers[uri]
+        self.log.debug("Queued %s for %s peers", msg_type, queued, icon="🔍", tag="BROADCAST")
 
-    async def broadcast(self, msg_type, data):
-        
-        disconnected_peers = []
-
-       
-        for uri, ws in list(self.outgoing_peers.items()):
-            try:
-                await self.send_message(ws, msg_type, data)
-                print(f"👥 [SENT {util.get_current_time_precise()}] Peer {self.my_id}: {msg_type} to {uri}")
-            except Exception as e:
-                print(f"⛔ [ERROR {util.get_current_time_precise()}] Peer {self.my_id}: Failed to send to {uri}: {e}")
-                disconnected_peers.append(uri)
+    def _open_send_queue(self, ws):
+        if ws not in self.send_queues:
+            self.send_queues[ws] = asyncio.Queue(self.send_queue_size)
+            self.send_tasks[ws] = asyncio.create_task(self._send_loop(ws, self.send_queues[ws]))
 
-        for uri in disconnected_peers:
-            if uri in self.outgoing_peers:
-                del self.outgoing_peers[uri]
-                
-        print(f"🔍 [BROADCAST {util.get_current_time_precise()}] Peer {self.my_id}: Sent {msg_type} to {len(self.outgoing_peers)} outgoing peers \n")
+    def _close_send_queue(self, ws):
+        self.send_queues.pop(ws, None)
+        send_task = self.send_tasks.pop(ws, None)
+        if send_task is not None:
+            send_task.cancel()
 
+    def _peer_uri(self, ws):
+        if ws in self.incoming_peers:
+            return self.incoming_peers[ws]["uri"]
 
-    async def update_loop(self):
-       
-        while True:
+        return next((uri for uri, peer_ws in self.outgoing_peers.items() if peer_ws is ws), None)
 
-           
-            if self.is_transaction_validation and self.get_network_size() == len(self.transaction_votes):
-                self._check_transaction_consensus()
+    def _enqueue(self, ws, message):
+        try:
+            self.send_queues[ws].put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        # the peer has not kept up with send_queue_size messages
+        if self.slow_peer_policy == "drop":
+            self.log.warning("Send queue to %s is full, dropping %s.", self._peer_uri(ws), message["type"])
+        else:
+            self.log.error("Send queue to %s is full, disconnecting.", self._peer_uri(ws))
+            # no more broadcasts to it, closing can take until the close timeout on a stalled peer,
+            # the close task is kept in send_tasks until the connection is cleaned up
+            self.send_queues.pop(ws, None)
+            self.send_tasks.pop(ws).cancel()
+            self.send_tasks[ws] = asyncio.create_task(ws.close())
 
-          
-            if self.chain.is_mining and not self.consensus_finalized:
-                if self.chain.mined_block is not None:
-                    block_to_send = self.chain.mined_block
-                    # stop mining locally
-                    self.chain.is_mining = False
+        return False
 
-                    print(f"\n📤 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Sending mined block to consensus.\n")
-                    await self.broadcast("VERIFY_BLOCK", block_to_send.to_dict())
+    async def _send_loop(self, ws, queue):
+        try:
+            while True:
+                message = await queue.get()
+                # not wait_for, before Python 3.12 it can swallow the cancellation when the send finishes at the same time
+                send = asyncio.ensure_future(self._write(ws, message))
+                try:
+                    done, _ = await asyncio.wait({send}, timeout=self.send_timeout)
+                finally:
+                    if not send.done():
+                        send.cancel()
+                if not done:
+                    raise TimeoutError(f"sending {message['type']} took over {self.send_timeout}s")
+                send.result()
+                if self.log.isEnabledFor(logging.DEBUG):
+                    # _peer_uri walks the outgoing peers, only for enabled debug logging
+                    self.log.debug("%s to %s", message["type"], self._peer_uri(ws), icon="👥", tag="SENT")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # timeouts included, the connection is cleaned up (and reconnected if outgoing) once it is closed
+            self.log.error("Failed to send to %s: %r", self._peer_uri(ws), e)
+            self.send_queues.pop(ws, None)
+            await ws.close()
 
-            await asyncio.sleep(0.1)  
 
     async def run(self, initial_peers=None):
        
         await self.start_server()
 
-        print(f"📝 [INFO {util.get_current_time_precise()}] Peer {self.my_id}: Pending transactions queue initialized")
+        self.log.info("Pending transactions queue initialized", icon="📝")
 
        
         if initial_peers:
@@ -693,8 +1050,16 @@ class Peer:
                 if peer_uri != self.my_uri:
                     asyncio.create_task(self.connect_to_peer(peer_uri))
 
-       
-        asyncio.create_task(self.update_loop())
 
-        while True:
-            await asyncio.sleep(5)
\ No newline at end of file
+        try:
+            while True:
+                await asyncio.sleep(5)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        # the mining thread gives up its block, the worker processes are stopped and joined
+        self.chain.can_mine = False
+        if self.chain.mining_engine is not None:
+            self.chain.mining_engine.shutdown()
+        self.log.info("Peer stopped", icon="🛑")
\ No newline at end of file
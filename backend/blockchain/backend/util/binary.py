@@ -0,0 +1,127 @@
+import struct
+
+# Helpers for the compact binary encoding of blocks (to_bytes/from_bytes on the
+# core classes). All integers are big endian, strings and byte strings carry a
+# u16 length and hashes are stored as raw 32 bytes instead of hex.
+# Library-only format: the block log and GET_BLOCKS keep using to_dict, nothing
+# here is stored or sent between peers. Keys are always written inline, so a
+# block decodes the same on every node.
+
+FORMAT_VERSION = 2
+
+NONE_LENGTH = 0xFFFF
+NONE_HASH = 0xFF
+
+UINT8 = struct.Struct(">B")
+UINT16 = struct.Struct(">H")
+UINT32 = struct.Struct(">I")
+UINT64 = struct.Struct(">Q")
+INT64 = struct.Struct(">q")
+
+
+def pack_uint8(value:int):
+    return UINT8.pack(value)
+
+def pack_uint32(value:int):
+    return UINT32.pack(value)
+
+def pack_uint64(value:int):
+    return UINT64.pack(value)
+
+def pack_int64(value:int):
+    return INT64.pack(value)
+
+def pack_bytes(value:bytes):
+    if value is None:
+        return UINT16.pack(NONE_LENGTH)
+
+    return UINT16.pack(len(value)) + value
+
+def pack_str(value:str):
+    return pack_bytes(value.encode("utf-8") if value is not None else None)
+
+def pack_hash(value:str):
+    # None, "" (not computed yet) or a 64 character hex hash
+    if value is None:
+        return pack_uint8(NONE_HASH)
+    if value == "":
+        return pack_uint8(0)
+
+    raw = bytes.fromhex(value)
+    if len(raw) != 32:
+        raise ValueError(f"Invalid hash {value}")
+
+    return pack_uint8(32) + raw
+
+def compact_hex(value):
+    # in-memory form of hashes and ids: lowercase hex is kept as raw bytes,
+    # anything else (None, "", genesis id "1") as is, expand_hex gives back the same value
+    if isinstance(value, str) and value and len(value) % 2 == 0:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            return value
+        if raw.hex() == value:
+            return raw
+
+    return value
+
+def expand_hex(value):
+    return value.hex() if isinstance(value, bytes) else value
+
+def pack_key(key:str):
+    # DER bytes of the public key
+    return pack_bytes(bytes.fromhex(key))
+
+
+class Reader:
+    def __init__(self, data:bytes, offset:int = 0):
+        self.data = bytes(data)
+        self.offset = offset
+
+    def read(self, size:int):
+        if self.offset + size > len(self.data):
+            raise ValueError("Unexpected end of data")
+
+        value = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return value
+
+    def _unpack(self, fmt:struct.Struct):
+        # struct.error on truncated data
+        value = fmt.unpack_from(self.data, self.offset)[0]
+        self.offset += fmt.size
+        return value
+
+    def uint8(self):
+        return self._unpack(UINT8)
+
+    def uint32(self):
+        return self._unpack(UINT32)
+
+    def uint64(self):
+        return self._unpack(UINT64)
+
+    def int64(self):
+        return self._unpack(INT64)
+
+    def bytes(self):
+        length = self._unpack(UINT16)
+        if length == NONE_LENGTH:
+            return None
+
+        return self.read(length)
+
+    def str(self):
+        value = self.bytes()
+        return value.decode("utf-8") if value is not None else None
+
+    def hash(self):
+        length = self.uint8()
+        if length == NONE_HASH:
+            return None
+
+        return self.read(length).hex()
+
+    def key(self):
+        return self.bytes().hex()
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pss
+
+class KeyCache:
+    # Bounded LRU of imported RSA keys and their PSS objects, keyed by hex DER key.
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # {hex key: (RSA key, pss scheme)}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key:str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+
+        raw_key = RSA.import_key(bytes.fromhex(key))
+        entry = (raw_key, pss.new(raw_key))
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return entry
+
+    def get_key(self, key:str):
+        return self.get(key)[0]
+
+    def get_scheme(self, key:str):
+        return self.get(key)[1]
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
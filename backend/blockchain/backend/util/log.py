@@ -0,0 +1,174 @@
+import sys
+import json
+import time
+import logging
+
+# Logging of peers and the core classes, on top of the standard logging module.
+# Every record carries an icon and a tag (RECV, SENT, CLNT, ...) next to its
+# level and is only formatted when a handler is going to write it, so a
+# disabled level costs a level check instead of building the message.
+#
+#   log = get_logger(f"peer.{peer_id}", peer=peer_id)
+#   log.info("Connected to %s", uri, icon="🔗", tag="CONN")
+#
+# Loggers live under "blockchain": "blockchain.peer.<id>" for every peer and
+# "blockchain.core"/"blockchain.util" for validation and signatures.
+
+ROOT = "blockchain"
+
+LEVEL_ICONS = {logging.DEBUG: "🔹", logging.INFO: "✅", logging.WARNING: "⚠️", logging.ERROR: "⛔", logging.CRITICAL: "⛔"}
+LEVEL_TAGS = {logging.DEBUG: "DEBUG", logging.INFO: "INFO", logging.WARNING: "WARN", logging.ERROR: "ERROR", logging.CRITICAL: "ERROR"}
+
+RATE_LIMIT = 20 # records per call site and second, 0 turns rate limiting off
+RATE_INTERVAL = 1.0 # s
+
+
+class Logger:
+    # thin wrapper of a logging.Logger: the level check comes first and records are
+    # made without the caller lookup of Logger._log, which costs more than the rest
+    __slots__ = ("logger", "peer")
+
+    def __init__(self, logger, peer=None):
+        self.logger = logger
+        self.peer = peer
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def setLevel(self, level):
+        self.logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    def debug(self, msg, *args, icon=None, tag=None):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, icon, tag)
+
+    def info(self, msg, *args, icon=None, tag=None):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, icon, tag)
+
+    def warning(self, msg, *args, icon=None, tag=None):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, icon, tag)
+
+    def error(self, msg, *args, icon=None, tag=None, exc_info=None):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, icon, tag, exc_info)
+
+    def _log(self, level, msg, args, icon, tag, exc_info=None):
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        record = self.logger.makeRecord(self.logger.name, level, "", 0, msg, args, exc_info, extra={"peer": self.peer, "icon": icon, "tag": tag, "suppressed": 0})
+        self.logger.handle(record)
+
+
+class TextFormatter(logging.Formatter):
+    # the format the peers printed before: ✅ [INFO 12:00:00.000000] Peer 1a2b3c4d: message
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._clock = None
+
+    def format(self, record):
+        icon = record.icon or LEVEL_ICONS.get(record.levelno, "")
+        tag = record.tag or LEVEL_TAGS.get(record.levelno, record.levelname)
+
+        # strftime once a second
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._clock = time.strftime("%H:%M:%S", time.localtime(second))
+        created = f"{self._clock}.{int((record.created - second) * 1e6):06d}"
+
+        text = f"{icon} [{tag} {created}] {f'Peer {record.peer}: ' if record.peer else ''}{record.getMessage()}"
+        if record.suppressed:
+            text += f" ({record.suppressed} similar messages suppressed)"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    # one JSON object per line, for log collectors
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "peer": record.peer,
+            "tag": record.tag,
+            "message": record.getMessage(),
+        }
+        if record.suppressed:
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    # at most `limit` records per logger and message template in every interval,
+    # the first record after a dropped run reports how many were dropped
+    def __init__(self, limit=RATE_LIMIT, interval=RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.windows = {} # {(logger, template): [window start, records, suppressed]}
+
+    def filter(self, record):
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        window = self.windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window is not None else 0
+            self.windows[key] = [now, 1, 0]
+            record.suppressed = suppressed
+            return True
+
+        if window[1] < self.limit:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        return False
+
+
+class _StdoutHandler(logging.StreamHandler):
+    # writes to the current sys.stdout, so contextlib.redirect_stdout still works like it
+    # did for print, and like print it leaves flushing to the stream
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+def configure(level="INFO", json_output=False, rate_limit=RATE_LIMIT, rate_interval=RATE_INTERVAL):
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    handler = _StdoutHandler()
+    handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+    if rate_limit:
+        handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+
+def get_logger(name, peer=None):
+    # INFO to stdout until configure is called, as the print statements did
+    if not logging.getLogger(ROOT).handlers:
+        configure()
+
+    return Logger(logging.getLogger(f"{ROOT}.{name}"), peer)
@@ -0,0 +1,59 @@
+from Crypto.Hash import SHA256
+
+# Binary Merkle tree over hex transaction hashes.
+# Inner nodes are SHA256(0x01 || left || right); a node without a sibling is
+# carried up unchanged instead of being paired with itself, so two different
+# transaction lists can never produce the same root.
+
+NODE_PREFIX = b"\x01"
+EMPTY_ROOT = SHA256.new(b"").hexdigest()
+
+
+def merkle_parent(left:str, right:str):
+    return SHA256.new(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level:list[str]):
+    next_level = []
+    for i in range(0, len(level) - 1, 2):
+        next_level.append(merkle_parent(level[i], level[i + 1]))
+    if len(level) % 2 == 1:
+        next_level.append(level[-1])
+
+    return next_level
+
+
+def merkle_root(hashes:list[str]):
+    if not hashes:
+        return EMPTY_ROOT
+
+    level = list(hashes)
+    while len(level) > 1:
+        level = _next_level(level)
+
+    return level[0]
+
+
+def merkle_proof(hashes:list[str], index:int):
+    # siblings from the leaf up to the root, with the side each one is on
+    path = []
+    level = list(hashes)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({"hash": level[sibling], "position": "left" if sibling < index else "right"})
+        level = _next_level(level)
+        index //= 2
+
+    return path
+
+
+def verify_merkle_proof(leaf:str, path:list[dict], root:str):
+    current = leaf
+    for step in path:
+        if step["position"] == "left":
+            current = merkle_parent(step["hash"], current)
+        else:
+            current = merkle_parent(current, step["hash"])
+
+    return current == root
@@ -0,0 +1,54 @@
+from . import util
+from . import merkle
+from ..core.block_header import BlockHeader, LEGACY_BLOCK_VERSION
+from ..core.transaction import Transaction
+
+# Light verification of a health record against a trusted block header, without the chain.
+# A proof is {"header": header dict, "transaction": transaction dict, "path": merkle path}
+# as returned by a peer for CLIENT_GET_PROOF. The trusted header has to come from
+# somewhere else than the peer that sent the proof (CLIENT_GET_HEADER of other peers),
+# the proof is only accepted for that block.
+
+MIN_DIFFICULTY = 1 # difficulty never retargets below 1
+
+
+def verify_header(header_dict:dict, transaction:Transaction = None):
+    # the header must hash to its block hash and that hash must meet its difficulty,
+    # legacy headers also need their only transaction to recompute the hash
+    header = BlockHeader.from_dict(header_dict)
+    if not isinstance(header.difficulty, int) or header.difficulty < MIN_DIFFICULTY:
+        return False
+
+    block_hash = header.get_hash(transaction)
+
+    return header.block_hash == block_hash and block_hash.startswith("0" * header.difficulty)
+
+
+def verify_proof(proof:dict, trusted_header:dict):
+    # returns the proven transaction or None
+    try:
+        header = BlockHeader.from_dict(proof["header"])
+        transaction = Transaction.from_dict(proof["transaction"])
+
+        # the block hash commits to the whole header, checked below
+        if header.height != trusted_header["height"] or header.block_hash != trusted_header["block_hash"]:
+            return None
+
+        if header.version == LEGACY_BLOCK_VERSION:
+            # the only transaction is hashed directly into the merkle root and the block hash
+            if header.merkle_root != util.hash256(transaction) or verify_header(proof["header"], transaction) is False:
+                return None
+        elif verify_header(proof["header"]) is False or not merkle.verify_merkle_proof(transaction.get_hash(), proof["path"], header.merkle_root):
+            return None
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+    return transaction
+
+
+def verify_health_record(proof:dict, health_record_id, health_record, trusted_header:dict):
+    transaction = verify_proof(proof, trusted_header)
+    if transaction is None or transaction.body.health_record_id != health_record_id:
+        return False
+
+    return util.hash256(health_record) == transaction.body.health_record_hash
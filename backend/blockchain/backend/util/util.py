@@ -1,25 +1,50 @@
+import os
 import json
 import datetime
-from Crypto.PublicKey import RSA
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from Crypto.Hash import SHA256
 from Crypto.Signature import pss
 from dataclasses import asdict
+from .key_cache import KeyCache
+from . import log
+
+key_cache = KeyCache()
+logger = log.get_logger("util")
 
 
 def double_hash256(s):
     # two rounds of sha265
     return  SHA256.new(SHA256.new(str(s).encode('utf-8')).digest()).hexdigest()
 
+def nonce_hasher(prefix:str, suffix:str):
+    # double_hash256(prefix + str(nonce) + suffix) with the prefix hashed only once,
+    # each nonce continues from a copy of the prefix state
+    prefix_state = hashlib.sha256(prefix.encode('utf-8'))
+    suffix_bytes = suffix.encode('utf-8')
+
+    def hash_nonce(nonce:int):
+        state = prefix_state.copy()
+        state.update(str(nonce).encode('utf-8') + suffix_bytes)
+        return hashlib.sha256(state.digest()).hexdigest()
+
+    return hash_nonce
+
 def hash256(s):
     return SHA256.new(str(s).encode('utf-8')).hexdigest()
 
+def key_digest(key:str):
+    # short fixed-size digest of a hex DER key, used as an index key
+    return SHA256.new(str(key).encode('utf-8')).digest()[:8]
+
 
 def write_to_json_file(path:str, data:dict[str,any], mode = "w"):
     try:
         with open(path,mode,encoding='utf-8') as f:
             json.dump(data,f, indent=4, ensure_ascii=False)
     except Exception:
-        print(f"Error while writing in {path} file!")
+        logger.error("Error while writing in %s file!", path)
         return False
 
     return True
@@ -30,18 +55,25 @@ def read_from_json_file(path:str):
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except FileNotFoundError:
-        print(f"File {path} does not exist!") 
+        logger.info("File %s does not exist!", path)
     except json.JSONDecodeError:
-        print(f"Warning: {path} contains invalid JSON. Initializing with empty data.")
+        logger.warning("%s contains invalid JSON. Initializing with empty data.", path)
         return {}
     
     return data
 
+def _get_pss(key):
+    # hex DER keys go through the cache, already imported keys are used as is
+    if isinstance(key, str):
+        return key_cache.get_scheme(key)
+
+    return pss.new(key)
+
 def sign_data(data:bytes, key):
 
     data_hash = SHA256.new(data)
 
-    signature = pss.new(key).sign(data_hash)
+    signature = _get_pss(key).sign(data_hash)
 
     return signature
 
@@ -50,14 +82,41 @@ def verify_signature(data:bytes, signature, key):
     data_hash = SHA256.new(data)
 
     try:
-        pss.new(key).verify(data_hash, signature)
-        print("✅ Signature is valid.")
+        _get_pss(key).verify(data_hash, signature)
+        logger.debug("Signature is valid.")
     except (ValueError, TypeError):
-        print("❌ Signature is invalid!")
+        logger.warning("Signature is invalid!", icon="❌")
         return False
     
     return True
 
+def _verify_signature_chunk(items):
+    results = []
+    for data, signature, key in items:
+        try:
+            _get_pss(key).verify(SHA256.new(data), signature)
+            results.append(True)
+        except (ValueError, TypeError):
+            results.append(False)
+
+    return results
+
+def verify_signatures_batch(items, workers=None, chunk_size=256):
+    # items = [(canonical_bytes, signature, creator_key), ...], returns [bool, ...] in the same order
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(items) <= chunk_size:
+        return _verify_signature_chunk(items)
+
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for chunk_results in executor.map(_verify_signature_chunk, chunks):
+            results.extend(chunk_results)
+
+    return results
+
 def object_to_canonical_bytes_json(obj):
     
     if hasattr(obj, '__dict__'):
@@ -65,6 +124,9 @@ def object_to_canonical_bytes_json(obj):
         data = obj.__dict__.copy()
     elif isinstance(obj, dict):
         data = obj
+    elif hasattr(obj, 'to_dict'):
+        # slotted core objects, to_dict has the same keys and values as their old __dict__
+        data = obj.to_dict()
     elif hasattr(obj, '_asdict'):
         
         data = obj._asdict()
@@ -79,9 +141,13 @@ def object_to_canonical_bytes_json(obj):
     json_str = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
     return json_str.encode('utf-8')
 
+def transaction_hash(transaction_dict:dict):
+    # leaf of the block merkle tree, commits to the body and the signature
+    return SHA256.new(object_to_canonical_bytes_json(transaction_dict)).hexdigest()
+
 
 def get_raw_key(key:str):
-    return RSA.import_key(bytes.fromhex(key))
+    return key_cache.get_key(key)
 
 def get_current_time_precise():
     trenutno_vreme = datetime.datetime.now()
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import json
+import time
+import uuid
+from datetime import datetime
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+
+# Usage: python blockchain/benchmarks/block_encoding.py [blocks] [transactions_per_block]
+# Encode/decode time and size of the binary block format (library only, see
+# backend/util/binary.py) against JSON.
+
+KEY_COUNT = 50
+
+
+def build_blocks(count, transactions_per_block):
+    keys = [(f"30820122{i:04x}" + os.urandom(286).hex()) for i in range(KEY_COUNT)]
+
+    blocks = []
+    for height in range(1, count + 1):
+        transactions = []
+        for i in range(transactions_per_block):
+            body = TransactionBody(keys[i % KEY_COUNT], keys[(height + i) % KEY_COUNT], uuid.uuid4().hex, datetime.now().isoformat(), os.urandom(32).hex())
+            transaction = Transaction(body)
+            transaction.signature = os.urandom(256)
+            transactions.append(transaction)
+
+        block = Block(BlockHeader(height, 5, "bench", os.urandom(32).hex()), transactions)
+        block.header.timestamp = datetime.now()
+        block.header.nonce = height * 1000
+        block.header.block_hash = os.urandom(32).hex()
+        blocks.append(block)
+
+    return blocks
+
+
+def run(name, encode, decode, blocks):
+    start = time.perf_counter()
+    encoded = [encode(block) for block in blocks]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in encoded:
+        decode(data)
+    decode_time = time.perf_counter() - start
+
+    size = sum(len(data) for data in encoded)
+    print(f"{name:>22} {encode_time * 1e6 / len(blocks):>12.1f}us {decode_time * 1e6 / len(blocks):>12.1f}us {size / len(blocks):>12.0f}B")
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    transactions_per_block = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    blocks = build_blocks(count, transactions_per_block)
+
+    print(f"{count} blocks, {transactions_per_block} transactions per block")
+    print(f"{'format':>22} {'encode/block':>14} {'decode/block':>14} {'size/block':>13}")
+    run("json (indent=4)", lambda block: json.dumps(block.to_dict(), indent=4).encode("utf-8"), lambda data: Block.from_dict(json.loads(data)), blocks)
+    json_size = run("json (compact)", lambda block: json.dumps(block.to_dict(), separators=(",", ":")).encode("utf-8"), lambda data: Block.from_dict(json.loads(data)), blocks)
+    binary_size = run("binary", lambda block: block.to_bytes(), lambda data: Block.from_bytes(data), blocks)
+
+    print(f"\nsize vs compact json: binary {binary_size / json_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
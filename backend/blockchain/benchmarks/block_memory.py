@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import gc
+import uuid
+import tracemalloc
+from backend.core.block import Block
+
+# Usage: python blockchain/benchmarks/block_memory.py [blocks] [transactions_per_block]
+# Traced bytes per block held in memory as Block objects, against the same
+# blocks held as the decoded JSON dicts they are loaded from.
+
+KEY_COUNT = 50
+
+
+def block_dicts(count, transactions_per_block):
+    keys = [(f"30820122{i:04x}" + os.urandom(286).hex()) for i in range(KEY_COUNT)]
+
+    for height in range(1, count + 1):
+        yield {
+            "header": {
+                "version": 2,
+                "id": uuid.uuid4().hex,
+                "previous_block_hash": os.urandom(32).hex(),
+                "merkle_root": os.urandom(32).hex(),
+                "timestamp": "2025-01-01T00:00:00.000001",
+                "height": height,
+                "difficulty": 5,
+                "nonce": height * 1000,
+                "miner": "bench",
+                "block_hash": os.urandom(32).hex()
+            },
+            "transactions": [{
+                "id": uuid.uuid4().hex,
+                "signature": os.urandom(256).hex(),
+                "body": {
+                    # json.loads gives every block its own copy of the key strings
+                    "creator": "".join(keys[i % KEY_COUNT]),
+                    "patient": "".join(keys[(height + i) % KEY_COUNT]),
+                    "health_record_hash": os.urandom(32).hex(),
+                    "date": "2025-01-01T00:00:00",
+                    "health_record_id": os.urandom(12).hex()
+                }
+            } for i in range(transactions_per_block)]
+        }
+
+
+def measure(count, transactions_per_block, build):
+    gc.collect()
+    tracemalloc.start()
+    blocks = [build(block_dict) for block_dict in block_dicts(count, transactions_per_block)]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del blocks
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    transactions_per_block = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"{count} blocks, {transactions_per_block} transactions per block")
+    dict_size = measure(count, transactions_per_block, lambda block_dict: block_dict)
+    block_size = measure(count, transactions_per_block, Block.from_dict)
+    print(f"{'json dicts':>12}: {dict_size / count:>8.0f} bytes/block")
+    print(f"{'Block':>12}: {block_size / count:>8.0f} bytes/block ({block_size / dict_size:.0%})")
+
+
+if __name__ == "__main__":
+    main()
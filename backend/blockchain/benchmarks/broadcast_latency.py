@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import io
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import statistics
+import contextlib
+import websockets
+from backend.network.peer import Peer
+
+# Usage: python blockchain/benchmarks/broadcast_latency.py [messages] [fast_peers] [stalled_peers] [message_kb] [interval_ms]
+# Time from Peer.broadcast until every fast peer has received the message, while
+# some other peers accept the connection but never read from it. The peers on
+# the other end are plain websocket servers, so only the sender side is measured.
+
+BASE_PORT = 9500
+RUN_TIMEOUT = 30 # s, a broadcast stuck behind a stalled peer never finishes
+
+
+async def run(message_count, fast_count, stalled_count, message_kb, interval):
+    arrivals = [{} for _ in range(fast_count)]
+
+    def fast_handler(index):
+        async def handler(ws):
+            async for message in ws:
+                msg = json.loads(message)
+                if msg.get("type") == "VERIFY_BLOCK":
+                    arrivals[index][msg["data"]["seq"]] = time.perf_counter()
+        return handler
+
+    async def stalled_handler(ws):
+        await asyncio.Future()
+
+    servers = []
+    uris = []
+    for i in range(fast_count + stalled_count):
+        handler = fast_handler(i) if i < fast_count else stalled_handler
+        servers.append(await websockets.serve(handler, "localhost", BASE_PORT + 1 + i))
+        uris.append(f"ws://localhost:{BASE_PORT + 1 + i}")
+
+    peer = Peer(BASE_PORT)
+    tasks = [asyncio.create_task(peer.connect_to_peer(uri)) for uri in uris]
+    while len(peer.outgoing_peers) < len(uris):
+        await asyncio.sleep(0.01)
+
+    payload = os.urandom(message_kb * 512).hex()
+    sent = {}
+    completed = 0
+
+    async def send_all():
+        nonlocal completed
+        for seq in range(message_count):
+            sent[seq] = time.perf_counter()
+            await peer.broadcast("VERIFY_BLOCK", {"seq": seq, "payload": payload})
+            completed += 1
+            # votes and blocks are spread over a round, not sent in one burst
+            await asyncio.sleep(interval)
+
+        while any(len(received) < message_count for received in arrivals):
+            await asyncio.sleep(0.001)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(send_all(), RUN_TIMEOUT)
+        stalled = False
+    except asyncio.TimeoutError:
+        stalled = True
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for seq, sent_at in sent.items():
+        if all(seq in received for received in arrivals):
+            latencies.append(max(received[seq] for received in arrivals) - sent_at)
+
+    for task in tasks:
+        task.cancel()
+    for server in servers:
+        server.close()
+
+    return latencies, completed, elapsed, stalled
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    fast_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    stalled_count = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    message_kb = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    interval = float(sys.argv[5]) / 1000 if len(sys.argv) > 5 else 0.002
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.makedirs(os.path.join(tmp, "blockchain", "db"))
+    os.chdir(tmp)
+    try:
+        # peer logging would dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, completed, elapsed, stalled = asyncio.run(run(message_count, fast_count, stalled_count, message_kb, interval))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+    print(f"{message_count} broadcasts of {message_kb} KB every {interval * 1000:g}ms, {fast_count} fast peers, {stalled_count} stalled peers")
+    print(f"broadcast calls returned {completed}/{message_count}, fast peers received all of {len(latencies)}" + (f", gave up after {RUN_TIMEOUT}s" if stalled else f" in {elapsed:.2f}s"))
+    if latencies:
+        latencies.sort()
+        print(f"latency to all fast peers mean {statistics.mean(latencies) * 1000:.1f}ms, p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+import uuid
+import shutil
+import tempfile
+import resource
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+from backend.core.block_store import BlockStore
+from backend.core.chain import Chain
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+
+# Usage: python blockchain/benchmarks/chain_startup.py [blocks] [eager|lazy]
+# Startup time and peak RSS of loading a synthetic block log fully into memory
+# against the lazy, memory-mapped view. Run each mode in its own process so the
+# RSS numbers do not mix.
+
+CREATOR = "30820122" + "ab" * 286
+PATIENT = "30820122" + "cd" * 286
+
+
+def write_log(count):
+    store = BlockStore("bench")
+    store.rewrite([])
+    with open(store.log_path, "ab") as log:
+        for height in range(count):
+            transaction = Transaction(TransactionBody(CREATOR, PATIENT, uuid.uuid4().hex, "2025-01-01T00:00:00", "00" * 32))
+            transaction.signature = bytes(256)
+            block = Block(BlockHeader(height, 5, "bench", "0" * 64), [transaction])
+            block.header.block_hash = "0" * 64
+            store.offsets.append(log.tell())
+            log.write(BlockStore._encode_record(block.to_dict()))
+    store._write_index()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    modes = sys.argv[2:] or ["eager", "lazy"]
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.makedirs(os.path.join(tmp, "blockchain", "db"))
+    os.chdir(tmp)
+    try:
+        write_log(count)
+        print(f"{count} blocks, log {os.path.getsize(BlockStore('bench').log_path) / 1e6:.1f}MB")
+
+        for mode in modes:
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.perf_counter()
+            chain = Chain("bench")
+            chain.load_chain_from_file("bench", lazy=mode == "lazy")
+            startup = time.perf_counter() - start
+
+            start = time.perf_counter()
+            chain.chain[-1]
+            chain.chain[len(chain.chain) // 2]
+            first_read = time.perf_counter() - start
+
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print(f"{mode:>6}: startup {startup * 1000:.1f}ms, two reads {first_read * 1000:.2f}ms, peak RSS +{(rss_after - rss_before) / 1024:.1f}MB")
+            del chain
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
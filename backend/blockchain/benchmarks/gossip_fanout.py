@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import io
+import time
+import shutil
+import asyncio
+import tempfile
+import statistics
+import contextlib
+from backend.network.peer import Peer
+from backend.core.account import Account
+from transaction_latency import build_transaction, submit
+
+# Usage: python blockchain/benchmarks/gossip_fanout.py [peers] [gossip_degree|mesh] [transactions]
+# Connections and messages of a full mesh against the gossip overlay on a
+# network of in-process peers that all join through the first one. Transactions
+# go through the normal vote and block rounds, so every peer still has to see
+# every vote for them to be accepted.
+
+BASE_PORT = 9600
+CONVERGE_TIMEOUT = 120 # s
+
+
+async def run(peer_count, gossip_degree, transactions):
+    doctor, patient = Account(), Account()
+    accounts = [{"public_key": account.public_key, "private_key": account.private_key} for account in (doctor, patient)]
+
+    peers = []
+    received = [0]
+    for i in range(peer_count):
+        peer = Peer(BASE_PORT + i, mining_workers=1, difficulty=1, gossip_degree=gossip_degree)
+        peer.accounts.extend(accounts)
+
+        # every frame a peer reads, duplicates included
+        def counting(handle_message):
+            async def handle(ws, message):
+                received[0] += 1
+                await handle_message(ws, message)
+            return handle
+        peer.handle_message = counting(peer.handle_message)
+        peers.append(peer)
+
+    start = time.perf_counter()
+    tasks = []
+    for i, peer in enumerate(peers):
+        tasks.append(asyncio.create_task(peer.run([peers[0].my_uri] if i else [])))
+        await asyncio.sleep(0.05)
+
+    while any(len(peer.known_peers) < peer_count - 1 for peer in peers):
+        if time.perf_counter() - start > CONVERGE_TIMEOUT:
+            raise TimeoutError(f"membership did not converge: {sorted(len(peer.known_peers) for peer in peers)}")
+        await asyncio.sleep(0.05)
+    converge_time = time.perf_counter() - start
+    # let the last connections settle before counting
+    await asyncio.sleep(1)
+
+    connections = sum(len(peer.outgoing_peers) for peer in peers)
+    received[0] = 0
+
+    latencies = []
+    for i in range(transactions):
+        latencies.append(await submit(peers[i % peer_count].my_uri, build_transaction(doctor, patient, i)))
+    messages = received[0]
+
+    for task in tasks:
+        task.cancel()
+
+    return converge_time, connections, messages, latencies
+
+
+def main():
+    peer_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    gossip_degree = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != "mesh" else None
+    transactions = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.makedirs(os.path.join(tmp, "blockchain", "db"))
+    os.chdir(tmp)
+    try:
+        # peer logging would dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            converge_time, connections, messages, latencies = asyncio.run(run(peer_count, gossip_degree, transactions))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+    times = [latency for latency, _ in latencies]
+    print(f"{peer_count} peers, {'full mesh' if gossip_degree is None else f'gossip degree {gossip_degree}'}, {transactions} transactions")
+    print(f"membership converged in {converge_time:.1f}s, {connections} connections")
+    print(f"accepted {sum(1 for _, success in latencies if success)}/{transactions}, {messages} messages received, {messages / max(1, transactions):.0f} per transaction")
+    print(f"latency mean {statistics.mean(times) * 1000:.0f}ms, max {max(times) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+import uuid
+from backend.core.chain import Chain
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+
+# Usage: python blockchain/benchmarks/health_record_lookup.py [sizes...]
+# Compares the old linear scan of Chain.chain with the health record index.
+
+CREATOR = "30820122" + "ab" * 140
+PATIENT = "30820122" + "cd" * 140
+LOOKUPS = 200
+
+
+def build_chain(size):
+    chain = Chain("bench")
+    for height in range(1, size + 1):
+        body = TransactionBody(CREATOR, PATIENT, uuid.uuid4().hex, "", "00" * 32)
+        block = Block.__new__(Block)
+        block.header = BlockHeader(height, chain.difficulty, "bench")
+        block.transactions = [Transaction(body)]
+        chain.chain.append(block)
+
+    return chain
+
+
+def scan(chain, health_record_id):
+    for block in chain.chain[1::]:
+        for transaction in block.transactions:
+            if transaction.body.health_record_id == health_record_id:
+                return transaction.body.health_record_hash
+
+    return None
+
+
+def measure(fn, ids):
+    start = time.perf_counter()
+    for health_record_id in ids:
+        fn(health_record_id)
+
+    return (time.perf_counter() - start) / len(ids)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'blocks':>10} {'build index':>12} {'scan/lookup':>14} {'index/lookup':>14} {'speedup':>10}")
+    for size in sizes:
+        chain = build_chain(size)
+
+        start = time.perf_counter()
+        chain.build_indexes()
+        build_time = time.perf_counter() - start
+
+        # worst case for the scan: records near the tip
+        ids = [block.transactions[0].body.health_record_id for block in chain.chain[-LOOKUPS:]]
+
+        scan_time = measure(lambda health_record_id: scan(chain, health_record_id), ids)
+        index_time = measure(chain.find_health_record, ids)
+
+        print(f"{size:>10} {build_time:>11.3f}s {scan_time * 1e3:>12.3f}ms {index_time * 1e6:>12.3f}us {scan_time / index_time:>9.0f}x")
+
+        del chain
+
+
+if __name__ == "__main__":
+    main()
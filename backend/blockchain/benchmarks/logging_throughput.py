@@ -0,0 +1,81 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+import shutil
+import tempfile
+import contextlib
+from backend.network.peer import Peer
+from backend.core.account import Account
+from backend.util import log
+from transaction_latency import build_transaction
+
+# Usage: python blockchain/benchmarks/logging_throughput.py [transactions] [log_calls]
+# Cost of logging on the validation hot path: Peer.verify_transaction (which runs
+# Transaction.is_valid and util.verify_signature) per second, and the cost of a
+# single peer log statement, for the log configurations a peer can run with.
+# Output goes to /dev/null, so formatting and writing are measured but not a terminal.
+
+CONFIGURATIONS = [
+    # (name, level, json_output, rate_limit)
+    ("WARNING", "WARNING", False, 0),
+    ("INFO", "INFO", False, 0),
+    ("INFO rate limited", "INFO", False, log.RATE_LIMIT),
+    ("INFO json", "INFO", True, 0),
+    ("DEBUG", "DEBUG", False, 0),
+]
+
+
+def measure(peer, transactions, log_calls):
+    start = time.perf_counter()
+    for data in transactions:
+        if not peer.verify_transaction(data):
+            raise ValueError("transaction did not validate")
+    verify_time = time.perf_counter() - start
+
+    # the per message lines of broadcast and the send loop
+    start = time.perf_counter()
+    for i in range(log_calls):
+        peer.log.info("Queued %s for %s peers", "TRANSACTION_VOTE", i, icon="🔍", tag="BROADCAST")
+    info_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(log_calls):
+        peer.log.debug("Queued %s for %s peers", "TRANSACTION_VOTE", i, icon="🔍", tag="BROADCAST")
+    debug_time = time.perf_counter() - start
+
+    return len(transactions) / verify_time, info_time / log_calls, debug_time / log_calls
+
+
+def main():
+    transaction_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    log_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    doctor, patient = Account(), Account()
+    accounts = [{"public_key": account.public_key, "private_key": account.private_key} for account in (doctor, patient)]
+    batches = [[build_transaction(doctor, patient, n * transaction_count + i) for i in range(transaction_count)] for n in range(len(CONFIGURATIONS))]
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.makedirs(os.path.join(tmp, "blockchain", "db"))
+    os.chdir(tmp)
+    results = []
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            peer = Peer(9700, mining_workers=1, difficulty=1)
+            peer.accounts.extend(accounts)
+            for (name, level, json_output, rate_limit), transactions in zip(CONFIGURATIONS, batches):
+                log.configure(level, json_output=json_output, rate_limit=rate_limit)
+                results.append((name, *measure(peer, transactions, log_calls)))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+    print(f"{transaction_count} transactions and {log_calls} log calls per configuration, output to {os.devnull}")
+    print(f"{'configuration':>18} {'verify/s':>10} {'info call':>12} {'debug call':>12}")
+    for name, verify_rate, info_call, debug_call in results:
+        print(f"{name:>18} {verify_rate:>10.1f} {info_call * 1e9:>10.0f}ns {debug_call * 1e9:>10.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+import uuid
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader, BLOCK_VERSION, LEGACY_BLOCK_VERSION
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+from backend.util import util
+
+# Usage: python blockchain/benchmarks/midstate_hashing.py [nonces]
+# Hashes per second of Block.get_hash per nonce against the precomputed prefix
+# used by the miner, for current and legacy blocks.
+
+CREATOR = "30820122" + "ab" * 286
+PATIENT = "30820122" + "cd" * 286
+
+
+def build_block(version):
+    transaction = Transaction(TransactionBody(CREATOR, PATIENT, uuid.uuid4().hex, "2025-01-01T00:00:00", "00" * 32))
+    transaction.signature = bytes(256)
+    return Block(BlockHeader(1, 5, "bench", "0" * 64, version), [transaction])
+
+
+def get_hash_per_nonce(block, nonces):
+    for nonce in range(nonces):
+        block.header.nonce = nonce
+        block.get_hash()
+
+
+def midstate(block, nonces):
+    hash_nonce = util.nonce_hasher(*block.header.get_hash_parts(block.transactions[0]))
+    for nonce in range(nonces):
+        hash_nonce(nonce)
+
+
+def rate(fn, block, nonces):
+    start = time.perf_counter()
+    fn(block, nonces)
+    return nonces / (time.perf_counter() - start)
+
+
+def main():
+    nonces = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    print(f"{'block':>8} {'get_hash/s':>14} {'midstate/s':>14} {'speedup':>9}")
+    for name, version in (("current", BLOCK_VERSION), ("legacy", LEGACY_BLOCK_VERSION)):
+        block = build_block(version)
+
+        hash_nonce = util.nonce_hasher(*block.header.get_hash_parts(block.transactions[0]))
+        for nonce in (0, 1, 12345, 10**9):
+            block.header.nonce = nonce
+            assert hash_nonce(nonce) == block.get_hash()
+
+        before = rate(get_hash_per_nonce, block, nonces)
+        after = rate(midstate, block, nonces)
+        print(f"{name:>8} {before:>14,.0f} {after:>14,.0f} {after / before:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
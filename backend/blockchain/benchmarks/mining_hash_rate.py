@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+import threading
+from types import SimpleNamespace
+from backend.core.block_header import BlockHeader
+from backend.core.mining import MiningEngine
+
+# Usage: python blockchain/benchmarks/mining_hash_rate.py [max_workers] [seconds]
+# Hash rate of the process pool miner from 1 to max_workers (default: all cores).
+
+UNREACHABLE_DIFFICULTY = 64
+
+
+def measure(workers, seconds):
+    engine = MiningEngine(workers)
+    header = BlockHeader(1, UNREACHABLE_DIFFICULTY, "bench", "0" * 64)
+    header.merkle_root = "ab" * 32
+
+    # start the worker processes before timing
+    warm_up = SimpleNamespace(can_mine=True)
+    threading.Timer(0.5, lambda: setattr(warm_up, "can_mine", False)).start()
+    engine.mine(header, warm_up)
+
+    chain = SimpleNamespace(can_mine=True)
+    threading.Timer(seconds, lambda: setattr(chain, "can_mine", False)).start()
+
+    start = time.perf_counter()
+    engine.mine(header, chain)
+    elapsed = time.perf_counter() - start
+
+    engine.shutdown()
+    return engine.attempts / elapsed
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    print(f"{'workers':>8} {'hashes/s':>14} {'speedup':>9}")
+    base = None
+    for workers in range(1, max_workers + 1):
+        rate = measure(workers, seconds)
+        base = base or rate
+        print(f"{workers:>8} {rate:>14,.0f} {rate / base:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import io
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import statistics
+import contextlib
+import websockets
+from backend.network.peer import Peer
+from backend.core.account import Account
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+from backend.util import util
+
+# Usage: python blockchain/benchmarks/transaction_latency.py [transactions] [peers] [difficulty] [block_timeout] [concurrency]
+# End-to-end latency of CLIENT_ADD_TRANSACTION -> TRANSACTION_RESULT on a small
+# network of in-process peers started in a temporary directory. block_timeout
+# overrides Peer.block_processing_timeout, which otherwise dominates the latency.
+# concurrency keeps that many transactions in flight to measure throughput.
+
+BASE_PORT = 9400
+HEALTH_RECORD_KEYS = ["_id", "patient_id", "patient_first_name", "patient_last_name", "doctor_first_name", "doctor_last_name", "doctor_id", "health_authority_name", "health_authority_id", "date"]
+
+
+def build_transaction(doctor, patient, i):
+    health_record = {key: f"{key}-{i}" for key in HEALTH_RECORD_KEYS}
+    transaction = Transaction(TransactionBody(doctor.public_key, patient.public_key, health_record["_id"], "2025-01-01T00:00:00", util.hash256(health_record)))
+    doctor.sign(transaction)
+    return {"transaction": transaction.to_dict(), "data_for_validation": health_record}
+
+
+async def submit(uri, data):
+    async with websockets.connect(uri) as ws:
+        start = time.perf_counter()
+        await ws.send(json.dumps({"type": "CLIENT_ADD_TRANSACTION", "data": data}))
+        while True:
+            response = json.loads(await ws.recv())
+            if response.get("type") == "TRANSACTION_RESULT":
+                return time.perf_counter() - start, response.get("success")
+
+
+async def run(transactions, peer_count, difficulty, block_timeout, concurrency):
+    doctor, patient = Account(), Account()
+    accounts = [{"public_key": account.public_key, "private_key": account.private_key} for account in (doctor, patient)]
+
+    peers = []
+    for i in range(peer_count):
+        peer = Peer(BASE_PORT + i, mining_workers=1, difficulty=difficulty)
+        if block_timeout is not None:
+            peer.block_processing_timeout = block_timeout
+        peer.accounts.extend(accounts)
+        peers.append(peer)
+
+    # every peer connects to the ones already listening and learns the rest from PEERS
+    tasks = []
+    for i, peer in enumerate(peers):
+        tasks.append(asyncio.create_task(peer.run([other.my_uri for other in peers[:i]])))
+        await asyncio.sleep(0.1)
+
+    while any(len(peer.known_peers) < peer_count - 1 or len(peer.outgoing_peers) < peer_count - 1 for peer in peers):
+        await asyncio.sleep(0.05)
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def submit_limited(i):
+        data = build_transaction(doctor, patient, i)
+        async with limit:
+            return await submit(peers[0].my_uri, data)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(submit_limited(i) for i in range(transactions)))
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+
+    return latencies, elapsed, len(peers[0].chain.chain) - 1
+
+
+def main():
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    peer_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    difficulty = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    block_timeout = float(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] != "default" else None
+    concurrency = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    os.makedirs(os.path.join(tmp, "blockchain", "db"))
+    os.chdir(tmp)
+    try:
+        # peer logging would dominate the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, elapsed, blocks = asyncio.run(run(transactions, peer_count, difficulty, block_timeout, concurrency))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+    times = [latency for latency, _ in latencies]
+    print(f"{transactions} transactions, {peer_count} peers, difficulty {difficulty}, block timeout {block_timeout if block_timeout is not None else 'default'}, concurrency {concurrency}")
+    print(f"accepted {sum(1 for _, success in latencies if success)}/{transactions}")
+    print(f"latency mean {statistics.mean(times) * 1000:.0f}ms, median {statistics.median(times) * 1000:.0f}ms, max {max(times) * 1000:.0f}ms")
+    print(f"throughput {transactions / elapsed:.2f} transactions/s, {blocks} blocks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import json
+import time
+import uuid
+import zlib
+from datetime import datetime
+from backend.core.account import Account
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+from backend.util import codec
+from backend.util import util
+
+# Usage: python blockchain/benchmarks/wire_compression.py [chain_blocks] [repeats]
+# Bytes on the wire and CPU per message type for plain JSON, websocket
+# permessage-deflate and the negotiated frame compressions in util/codec.py.
+# permessage-deflate is emulated with one raw deflate stream per connection
+# (context takeover, sync flush per message), which is what websockets does by default.
+# A RECEIVE_DATA over about 1700 blocks is bigger than codec.MAX_DECOMPRESSED_BYTES,
+# which a peer would refuse, so the benchmark's codecs decode up to BENCH_DECOMPRESSED_BYTES.
+
+ACCOUNT_COUNT = 5
+BENCH_DECOMPRESSED_BYTES = 2 ** 30
+
+
+def health_record(i):
+    return {k: f"{k}-{i}" for k in ["_id", "patient_id", "patient_first_name", "patient_last_name", "doctor_first_name", "doctor_last_name", "doctor_id", "health_authority_name", "health_authority_id", "date"]}
+
+
+def build_transaction(accounts, i):
+    record = health_record(i)
+    body = TransactionBody(accounts[i % ACCOUNT_COUNT].public_key, accounts[(i + 1) % ACCOUNT_COUNT].public_key, record["_id"], datetime.now().isoformat(), util.hash256(record))
+    transaction = Transaction(body)
+    transaction.signature = os.urandom(256)
+    return transaction, record
+
+
+def build_block(accounts, height, transactions_per_block=1):
+    transactions = [build_transaction(accounts, height * transactions_per_block + i)[0] for i in range(transactions_per_block)]
+    block = Block(BlockHeader(height, 5, str(uuid.uuid4())[:8], os.urandom(32).hex()), transactions)
+    block.header.timestamp = datetime.now()
+    block.header.nonce = height * 1000
+    block.header.merkle_root = block.compute_merkle_root()
+    block.header.block_hash = "00000" + os.urandom(32).hex()[5:]
+    return block
+
+
+def build_messages(chain_blocks):
+    accounts = [Account() for _ in range(ACCOUNT_COUNT)]
+    account_list = [{"public_key": account.public_key} for account in accounts]
+    transaction, record = build_transaction(accounts, 0)
+    block = build_block(accounts, 1, 10)
+    chain = [build_block(accounts, height).to_dict() for height in range(chain_blocks)]
+
+    blocks = []
+    size = 0
+    for block_dict in chain:
+        size += len(json.dumps(block_dict))
+        if size > 512 * 1024:
+            break
+        blocks.append(block_dict)
+
+    return [
+        ("TRANSACTION_VOTE", {"id": "1a2b3c4d", "transaction_id": transaction.id, "vote": True}),
+        ("VERIFY_TRANSACTION", {"transaction": transaction.to_dict(), "data_for_validation": record}),
+        ("VERIFY_BLOCK", block.to_dict()),
+        ("FINAL_BLOCK_CONSENSUS", {"winning_block": block.to_dict(), "winning_sender": "1a2b3c4d", "total_blocks": 3, "finalizer": "5e6f7a8b"}),
+        ("BLOCKS", {"from_height": 0, "height": chain_blocks - 1, "blocks": blocks}),
+        ("RECEIVE_DATA", {"chain": chain, "accounts": account_list}),
+    ]
+
+
+class PermessageDeflate:
+    def __init__(self):
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self.decompressor = zlib.decompressobj(-15)
+
+    def encode(self, message):
+        data = json.dumps(message).encode("utf-8")
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)[:-4]
+
+    def decode(self, frame):
+        return json.loads(self.decompressor.decompress(frame + b"\x00\x00\xff\xff"))
+
+
+def measure(make_encoder, message, repeats):
+    encoder = make_encoder()
+    start = time.perf_counter()
+    frames = [encoder.encode(message) for _ in range(repeats)]
+    encode_time = (time.perf_counter() - start) / repeats
+
+    # a deflate stream has to be decoded in order by the other end of the same connection
+    start = time.perf_counter()
+    for frame in frames:
+        encoder.decode(frame)
+    decode_time = (time.perf_counter() - start) / repeats
+
+    # first frame, a connection does not usually repeat the same message
+    return len(frames[0]), encode_time, decode_time
+
+
+def main():
+    chain_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    messages = build_messages(chain_blocks)
+    formats = [("json", lambda: codec.PLAIN), ("permessage-deflate", PermessageDeflate)]
+    for compression in codec.supported_compressions():
+        formats.append((f"{compression} frame", lambda compression=compression: codec.Codec(compression, max_decompressed_bytes=BENCH_DECOMPRESSED_BYTES)))
+
+    print(f"chain of {chain_blocks} blocks, compression threshold {codec.COMPRESSION_THRESHOLD}B")
+    print(f"{'message':>22} {'format':>20} {'bytes':>12} {'ratio':>7} {'encode':>12} {'decode':>12}")
+    for msg_type, data in messages:
+        message = {"type": msg_type, "data": data, "sender_id": "1a2b3c4d"}
+        count = max(1, repeats if msg_type != "RECEIVE_DATA" else repeats // 10)
+        json_size = None
+        for name, make_encoder in formats:
+            size, encode_time, decode_time = measure(make_encoder, message, count)
+            json_size = json_size or size
+            print(f"{msg_type:>22} {name:>20} {size:>12} {size / json_size:>7.0%} {encode_time * 1e3:>10.3f}ms {decode_time * 1e3:>10.3f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import time
+from backend.util import codec
+from wire_compression import build_messages, BENCH_DECOMPRESSED_BYTES
+
+# Usage: python blockchain/benchmarks/wire_protocol.py [chain_blocks] [repeats]
+# Messages/s and decode latency of the negotiated wire encodings in util/codec.py,
+# on a RECEIVE_DATA with the whole chain and on small consensus messages.
+# msgpack is only measured when the msgpack package is installed.
+# A RECEIVE_DATA over about 1700 blocks is bigger than codec.MAX_DECOMPRESSED_BYTES,
+# which a peer would refuse, so the benchmark's codecs decode up to BENCH_DECOMPRESSED_BYTES.
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(encoder, message, repeats):
+    encode_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frame = encoder.encode(message)
+        encode_times.append(time.perf_counter() - start)
+
+    decode_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        decoded = encoder.decode(frame)
+        decode_times.append(time.perf_counter() - start)
+
+    if decoded != message:
+        raise ValueError(f"{encoder.encoding}/{encoder.compression} does not round trip")
+
+    return len(frame), encode_times, decode_times
+
+
+def main():
+    chain_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    messages = dict(build_messages(chain_blocks))
+    codecs = []
+    for encoding in codec.supported_encodings()[::-1]:
+        for compression in [None] + codec.supported_compressions():
+            codecs.append(codec.Codec(compression, encoding=encoding, max_decompressed_bytes=BENCH_DECOMPRESSED_BYTES))
+
+    print(f"chain of {chain_blocks} blocks, {repeats} repeats, encodings: {', '.join(codec.supported_encodings())}")
+    print(f"{'message':>22} {'codec':>14} {'bytes':>12} {'encode/s':>10} {'decode/s':>10} {'decode p50':>12} {'decode p99':>12}")
+    for msg_type in ["TRANSACTION_VOTE", "VERIFY_BLOCK", "RECEIVE_DATA"]:
+        message = {"type": msg_type, "data": messages[msg_type], "sender_id": "1a2b3c4d"}
+        count = repeats if msg_type == "RECEIVE_DATA" else repeats * 100
+        for encoder in codecs:
+            size, encode_times, decode_times = measure(encoder, message, count)
+            name = f"{encoder.encoding}+{encoder.compression}" if encoder.compression else encoder.encoding
+            print(f"{msg_type:>22} {name:>14} {size:>12} {count / sum(encode_times):>10.1f} {count / sum(decode_times):>10.1f} {percentile(decode_times, 0.5) * 1e3:>10.3f}ms {percentile(decode_times, 0.99) * 1e3:>10.3f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
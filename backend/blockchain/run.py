@@ -1,26 +1,55 @@
 from backend.network.peer import Peer
-import sys
+from backend.util import codec
+from backend.util import log
+import argparse
 import asyncio
 
 
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("port", nargs="?", type=int, default=8765)
+    parser.add_argument("peers", nargs="*", help="ports or uris of peers to connect to")
+    parser.add_argument("--mining-workers", type=int, default=None, help="mining processes, defaults to the number of cores")
+    parser.add_argument("--full-verify", action="store_true", help="re-hash the whole chain on startup, ignoring the validation checkpoint")
+    parser.add_argument("--audit", action="store_true", help="full verification that also re-checks every transaction signature")
+    parser.add_argument("--lazy", action="store_true", help="keep only the block offset index in memory and read blocks on demand")
+    parser.add_argument("--difficulty", type=int, default=5, help="difficulty of a new chain, it is retargeted from block times afterwards")
+    parser.add_argument("--compression", choices=codec.supported_compressions() + ["none"], default="zlib", help="compression offered to peers for messages over 1 KiB")
+    parser.add_argument("--encoding", choices=codec.supported_encodings(), default=None, help="wire encoding offered to peers, defaults to msgpack when it is installed")
+    parser.add_argument("--permessage-deflate", action="store_true", help="also enable websocket deflate, it compresses every message including client replies")
+    parser.add_argument("--send-timeout", type=float, default=5.0, help="seconds a peer may take to accept one message before it is disconnected")
+    parser.add_argument("--slow-peer-policy", choices=["disconnect", "drop"], default="disconnect", help="what to do when a peer's send queue is full")
+    parser.add_argument("--gossip-degree", type=int, default=None, help="connect to only this many peers and relay broadcasts, instead of connecting to every peer")
+    parser.add_argument("--gossip-ttl", type=int, default=6, help="hops a gossip message is relayed")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper, default="INFO", help="DEBUG also logs every sent and broadcast message")
+    parser.add_argument("--log-json", action="store_true", help="log one JSON object per line instead of text")
+    parser.add_argument("--log-rate-limit", type=int, default=log.RATE_LIMIT, help="records per second from one log statement before the rest are counted and dropped, 0 logs everything")
+    parser.add_argument("--assembly-window-ms", type=float, default=50, help="how long mining waits for more accepted transactions to put in the same block")
+    return parser.parse_args()
+
+
 async def main():
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
-    peer = Peer(port)
-    
+    args = parse_args()
+    log.configure(args.log_level, json_output=args.log_json, rate_limit=args.log_rate_limit)
+    try:
+        peer = Peer(args.port, mining_workers=args.mining_workers, full_verify=args.full_verify, audit=args.audit, lazy=args.lazy, block_assembly_window=args.assembly_window_ms / 1000, difficulty=args.difficulty, compression=None if args.compression == "none" else args.compression, permessage_deflate=args.permessage_deflate, encoding=args.encoding, send_timeout=args.send_timeout, slow_peer_policy=args.slow_peer_policy, gossip_degree=args.gossip_degree, gossip_ttl=args.gossip_ttl)
+    except ValueError as e:
+        raise SystemExit(f"Peer did not start: {e}")
+
     initial_peers = []
-    if len(sys.argv) > 2:
-        
-        await peer.load_data_from_peer(f"ws://localhost:{sys.argv[2]}")
+    if args.peers:
 
-        for peer_arg in sys.argv[2:]:
+        await peer.load_data_from_peer(f"ws://localhost:{args.peers[0]}")
+
+        for peer_arg in args.peers:
             if peer_arg.isdigit():
                 uri = f"ws://localhost:{peer_arg}"
             else:
                 uri = peer_arg
             initial_peers.append(uri)
-    
+
     await peer.run(initial_peers)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
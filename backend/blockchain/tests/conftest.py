@@ -0,0 +1,14 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
+import pytest
+
+# Usage (from backend/blockchain): python -m pytest -q tests
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    # peers keep their files in ./blockchain/db, relative to the working directory
+    os.makedirs(tmp_path / "blockchain" / "db")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "blockchain" / "db"
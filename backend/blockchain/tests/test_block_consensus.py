@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from backend.network.peer import Peer
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+
+UNREACHABLE_DIFFICULTY = 64
+
+
+def competing_block(peer, miner, timestamp):
+    last_block = peer.chain.get_last_block()
+    block = Block(BlockHeader(last_block.header.height + 1, 1, miner, last_block.header.block_hash))
+    block.header.mining_start = timestamp - timedelta(milliseconds=10)
+    block.header.timestamp = timestamp
+    while not block.is_solved():
+        block.header.nonce += 1
+        block.header.block_hash = block.get_hash()
+    return block
+
+
+@pytest.mark.parametrize("mining_workers", [1, 2])
+def test_aborted_block_stays_out_of_consensus(db_dir, mining_workers):
+    async def run():
+        peer = Peer(9801, mining_workers=mining_workers, difficulty=1)
+        peer.block_processing_timeout = 0.5
+        try:
+            # our own block can't be solved, it is still being mined when the competing blocks arrive
+            block = peer.chain.prepare_block()
+            block.header.difficulty = UNREACHABLE_DIFFICULTY
+            mining = asyncio.create_task(asyncio.to_thread(peer.chain.mine_block, block))
+            await asyncio.sleep(0.2)
+
+            now = datetime.now()
+            first = competing_block(peer, "first", now)
+            second = competing_block(peer, "second", now + timedelta(seconds=1))
+
+            await peer._handle_verify_block(second.to_dict(), "second")
+            await mining
+            assert block.is_solved() is False
+            assert peer.chain.mined_block is None
+
+            await peer._handle_verify_block(first.to_dict(), "first")
+            assert len(peer.received_blocks) == 2
+            assert all(isinstance(timestamp, datetime) for timestamp in peer.received_blocks)
+
+            await peer.finalize_task
+            assert peer.mined_block.header.block_hash == first.header.block_hash
+            # the round is closed and the peer can mine the next block
+            assert peer.chain.can_mine is True
+            assert peer.block_round_active is False
+            assert not peer.received_blocks
+        finally:
+            peer.shutdown()
+
+    asyncio.run(run())
+
+
+def test_stopped_single_thread_search_leaves_header_unsolved(db_dir):
+    peer = Peer(9802, mining_workers=1, difficulty=1)
+    block = peer.chain.prepare_block()
+    block.header.difficulty = UNREACHABLE_DIFFICULTY
+    peer.chain.can_mine = False
+
+    peer.chain.mine_block(block)
+
+    assert block.header.block_hash == ""
+    assert block.is_solved() is False
+    assert peer.chain.mined_block is None
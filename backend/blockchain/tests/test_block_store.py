@@ -0,0 +1,99 @@
+import os
+from array import array
+import pytest
+from backend.core.block_store import BlockStore
+
+
+def blocks(count, start=0):
+    return [{"header": {"height": height, "block_hash": f"{height:064x}"}, "transactions": []} for height in range(start, start + count)]
+
+
+def reopen(store):
+    reopened = BlockStore("test")
+    reopened.log_path, reopened.index_path = store.log_path, store.index_path
+    reopened.open()
+    return reopened
+
+
+def assert_consistent(store, expected):
+    # offsets, index file and log agree with the expected records
+    assert len(store.offsets) == len(expected)
+    assert store.size == os.path.getsize(store.log_path)
+    with open(store.index_path, "rb") as f:
+        assert f.read() == store.offsets.tobytes()
+    assert store.read_all() == expected
+    for height, block_dict in enumerate(expected):
+        assert store.read(height) == block_dict
+
+
+def append_to(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BlockStore("test")
+    store.log_path = str(tmp_path / "test_chain.log")
+    store.index_path = str(tmp_path / "test_chain.idx")
+    store.open()
+    for block_dict in blocks(5):
+        store.append(block_dict)
+    return store
+
+
+def test_reopen(store):
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_torn_record_is_dropped(store):
+    append_to(store.log_path, BlockStore._encode_record(blocks(1, 5)[0])[:-10])
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_indexed_torn_record_is_dropped(store):
+    append_to(store.log_path, BlockStore._encode_record(blocks(1, 5)[0])[:10])
+    append_to(store.index_path, array("Q", [store.size]).tobytes())
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_index_entries_past_the_log_are_dropped(store):
+    # left by a crash inside truncate, the log is cut before the index is rewritten
+    append_to(store.index_path, array("Q", [store.size, store.size + 100]).tobytes())
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_unparsable_record_is_dropped(store):
+    append_to(store.log_path, b"{\"header\":\n")
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_unindexed_record_is_picked_up(store):
+    append_to(store.log_path, BlockStore._encode_record(blocks(1, 5)[0]))
+    assert_consistent(reopen(store), blocks(6))
+
+
+def test_lost_index_is_rebuilt(store):
+    os.remove(store.index_path)
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_half_written_index_entry_is_dropped(store):
+    append_to(store.index_path, b"\x00\x01\x02")
+    assert_consistent(reopen(store), blocks(5))
+
+
+def test_truncate_then_append(store):
+    store.truncate(3)
+    assert_consistent(store, blocks(3))
+
+    store.append(blocks(1, 10)[0])
+    expected = blocks(3) + blocks(1, 10)
+    assert_consistent(store, expected)
+    assert_consistent(reopen(store), expected)
+
+
+def test_rewrite(store):
+    store.rewrite(blocks(4, 10))
+    assert_consistent(store, blocks(4, 10))
+    assert_consistent(reopen(store), blocks(4, 10))
@@ -0,0 +1,33 @@
+import pytest
+from Crypto.Hash import SHA256
+from backend.util import merkle
+
+
+def leaves(count):
+    return [SHA256.new(str(i).encode()).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize("count", range(1, 10))
+def test_every_leaf_has_a_proof(count):
+    hashes = leaves(count)
+    root = merkle.merkle_root(hashes)
+    for index, leaf in enumerate(hashes):
+        path = merkle.merkle_proof(hashes, index)
+        assert merkle.verify_merkle_proof(leaf, path, root)
+        if count > 1:
+            assert merkle.verify_merkle_proof(hashes[(index + 1) % count], path, root) is False
+
+
+@pytest.mark.parametrize("count", [3, 5, 7, 9])
+def test_unpaired_leaf_is_carried_up(count):
+    # pairing the last leaf with itself would give [a, b, c] and [a, b, c, c] the same root
+    hashes = leaves(count)
+    assert merkle.merkle_root(hashes + hashes[-1:]) != merkle.merkle_root(hashes)
+    assert len(merkle.merkle_proof(hashes, count - 1)) < len(merkle.merkle_proof(hashes, 0))
+
+
+def test_empty_and_single_leaf():
+    assert merkle.merkle_root([]) == merkle.EMPTY_ROOT
+    leaf = leaves(1)[0]
+    assert merkle.merkle_root([leaf]) == leaf
+    assert merkle.merkle_proof([leaf], 0) == []
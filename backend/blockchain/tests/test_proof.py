@@ -0,0 +1,71 @@
+import json
+from backend.core.chain import Chain
+from backend.core.account import Account
+from backend.core.account_registry import AccountRegistry
+from backend.core.block import Block
+from backend.core.block_header import BlockHeader
+from backend.core.transaction import Transaction
+from backend.core.transaction_body import TransactionBody
+from backend.util import util
+from backend.util import proof
+
+HEALTH_RECORD_FIELDS = ["_id", "patient_id", "patient_first_name", "patient_last_name", "doctor_first_name", "doctor_last_name", "doctor_id", "health_authority_name", "health_authority_id", "date"]
+
+
+def health_record(health_record_id):
+    return {field: health_record_id for field in HEALTH_RECORD_FIELDS}
+
+
+def signed_transaction(doctor, patient, record):
+    transaction = Transaction(TransactionBody(doctor.public_key, patient.public_key, record["_id"], "2025", util.hash256(record)))
+    doctor.sign(transaction)
+    return transaction
+
+
+def build_chain(doctor, patient, health_record_ids):
+    chain = Chain("proof", initial_difficulty=1, mining_workers=1)
+    chain.load_chain_from_file("proof")
+    chain.accounts = AccountRegistry("proof")
+    chain.accounts.load()
+    for account in (doctor, patient):
+        chain.accounts.add({"public_key": account.public_key, "private_key": account.private_key})
+    for health_record_id in health_record_ids:
+        record = health_record(health_record_id)
+        transaction = signed_transaction(doctor, patient, record)
+        assert chain.add_transaction(transaction, record)
+        chain.accept_transaction(transaction.id)
+
+    block = chain.create_new_block()
+    chain.add_to_block_to_chain(block)
+    return chain
+
+
+def test_proof_verifies_against_trusted_header(db_dir):
+    doctor, patient = Account(), Account()
+    chain = build_chain(doctor, patient, ["1", "2", "3"])
+    trusted_header = chain.get_last_block().header.to_dict()
+
+    for health_record_id in ["1", "2", "3"]:
+        record_proof = json.loads(json.dumps(chain.get_health_record_proof(health_record_id)))
+        assert proof.verify_proof(record_proof, trusted_header) is not None
+        assert proof.verify_health_record(record_proof, health_record_id, health_record(health_record_id), trusted_header)
+        assert not proof.verify_health_record(record_proof, health_record_id, dict(health_record(health_record_id), date="x"), trusted_header)
+
+
+def test_made_up_block_is_rejected(db_dir):
+    # a peer can mine a block of its own at difficulty 1 with a transaction that is not in the chain
+    doctor, patient = Account(), Account()
+    chain = build_chain(doctor, patient, ["1"])
+    trusted_header = chain.get_last_block().header.to_dict()
+
+    record = health_record("1")
+    forged = Block(BlockHeader(1, 1, "forger", chain.chain[0].header.block_hash), [signed_transaction(doctor, patient, dict(record, date="x"))])
+    forged.header.mining_start = forged.header.timestamp = chain.get_last_block().header.timestamp
+    while not forged.is_solved():
+        forged.header.nonce += 1
+        forged.header.block_hash = forged.get_hash()
+    forged_proof = {"header": forged.header.to_dict(), "transaction": forged.transactions[0].to_dict(), "path": []}
+
+    assert proof.verify_proof(forged_proof, forged.header.to_dict()) is not None
+    assert proof.verify_proof(forged_proof, trusted_header) is None
+    assert not proof.verify_health_record(forged_proof, "1", dict(record, date="x"), trusted_header)
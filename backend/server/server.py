@@ -18,7 +18,7 @@ from blockchain.backend.core.transaction import Transaction
 from blockchain.backend.core.transaction_body import TransactionBody
 from blockchain.backend.util import util
 from entities.doctor import Doctor
-from util.util import generate_secret_key_b64, convert_secret_key_to_bytes, encrypt, decrypt, send_to_blockchain_per_request, serialize_doc
+from util.util import generate_secret_key_b64, convert_secret_key_to_bytes, encrypt, decrypt, send_to_blockchain_per_request, verify_health_record_with_proof, serialize_doc
 
 load_dotenv()
 
@@ -563,15 +563,8 @@ def verify_health_record(hr_id):
     try:
 
         health_record_for_verification = json.loads(decrypt(health_record_dict["data"],convert_secret_key_to_bytes(health_record_dict["key"])))
-        message = {
-                "type": "CLIENT_VERIFY_TRANSACTION",
-                "data": {
-                    "health_record_id":hr_id,
-                    "health_record" : health_record_for_verification
-                }
-        }
 
-        blockchain_success, blockchain_response = send_to_blockchain_per_request(message)
+        blockchain_success, blockchain_response = verify_health_record_with_proof(hr_id, health_record_for_verification)
         response_data = {}
         response =  blockchain_response
 
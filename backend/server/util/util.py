@@ -5,11 +5,26 @@ import json
 from bson import ObjectId, Binary
 from dotenv import load_dotenv
 import os
+import time
+from collections import OrderedDict
 
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 from Crypto.Util.Padding import pad, unpad
 
+from blockchain.backend.util import proof as blockchain_proof
+
+# Proofs come from PEER_FOR_COMMUNICATION and are checked against block headers from
+# the peers in HEADER_PEERS (comma separated uris), a header is only trusted when all of
+# them return the same block. Without HEADER_PEERS the peer checks the record itself.
+# Entries expire, so a fork switch is picked up again.
+health_record_proofs = OrderedDict()  # {health_record_id: (fetched at, proof)}, oldest first
+trusted_headers = OrderedDict()  # {height: (fetched at, header)}, oldest first
+PROOF_CACHE_SIZE = 10_000
+PROOF_CACHE_TTL = 300 # s
+HEADER_CACHE_SIZE = 10_000
+HEADER_CACHE_TTL = 300 # s
+
 def generate_secret_key_b64():
     key = get_random_bytes(16)
     return base64.b64encode(key).decode('utf-8')
@@ -30,11 +45,11 @@ def decrypt(enc_data, key):
     plaintext = unpad(cipher.decrypt(ciphertext), AES.block_size)
     return plaintext.decode("utf-8")
 
-async def send_to_blockchain_and_wait_response(message, timeout=60):
+async def send_to_blockchain_and_wait_response(message, timeout=60, uri=None):
    
     try:
         load_dotenv()
-        uri = os.getenv("PEER_FOR_COMMUNICATION")
+        uri = uri or os.getenv("PEER_FOR_COMMUNICATION")
         
         async with websockets.connect(uri) as websocket:
             
@@ -53,7 +68,7 @@ async def send_to_blockchain_and_wait_response(message, timeout=60):
     except Exception as e:
         return False, {"error": f"Blockchain connection error: {str(e)}"}
 
-def send_to_blockchain_per_request(message):
+def send_to_blockchain_per_request(message, uri=None):
    
     try:
        
@@ -61,7 +76,7 @@ def send_to_blockchain_per_request(message):
         asyncio.set_event_loop(loop)
         try:
             success, response = loop.run_until_complete(
-                send_to_blockchain_and_wait_response(message)
+                send_to_blockchain_and_wait_response(message, uri=uri)
             )
             return success, response
         finally:
@@ -69,6 +84,87 @@ def send_to_blockchain_per_request(message):
     except Exception as e:
         return False, {"error": f"Failed to communicate with blockchain: {str(e)}"}
 
+def _cache_get(cache, key, ttl):
+    cached = cache.get(key)
+    if cached is None or time.monotonic() - cached[0] >= ttl:
+        return None
+
+    return cached[1]
+
+def _cache_put(cache, key, value, size):
+    cache.pop(key, None)
+    cache[key] = (time.monotonic(), value)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+def get_header_peers():
+    # never the peer the proofs come from
+    load_dotenv()
+    proof_peer = os.getenv("PEER_FOR_COMMUNICATION")
+    return [uri.strip() for uri in os.getenv("HEADER_PEERS", "").split(",") if uri.strip() and uri.strip() != proof_peer]
+
+def get_trusted_header(height):
+    # the header of the block at height if every header peer returns the same one, otherwise None
+    header = _cache_get(trusted_headers, height, HEADER_CACHE_TTL)
+    if header is not None:
+        return header
+
+    uris = get_header_peers()
+    if not uris:
+        return None
+
+    for uri in uris:
+        success, response = send_to_blockchain_per_request({
+            "type": "CLIENT_GET_HEADER",
+            "data": {"height": height}
+        }, uri)
+
+        peer_header = response.get("message") if success else None
+        if not isinstance(peer_header, dict) or peer_header.get("height") != height:
+            return None
+        if header is not None and peer_header.get("block_hash") != header.get("block_hash"):
+            return None
+        header = peer_header
+
+    _cache_put(trusted_headers, height, header, HEADER_CACHE_SIZE)
+    return header
+
+def verify_health_record_with_proof(health_record_id, health_record):
+    # the proof is fetched from the peer once per PROOF_CACHE_TTL and its header from the
+    # header peers once per HEADER_CACHE_TTL, verifications in between are local
+    if not get_header_peers():
+        return send_to_blockchain_per_request({
+            "type": "CLIENT_VERIFY_TRANSACTION",
+            "data": {"health_record_id": health_record_id, "health_record": health_record}
+        })
+
+    proof = _cache_get(health_record_proofs, health_record_id, PROOF_CACHE_TTL)
+    fetched = proof is None
+    if fetched:
+        success, response = send_to_blockchain_per_request({
+            "type": "CLIENT_GET_PROOF",
+            "data": {"health_record_id": health_record_id}
+        })
+
+        if not success or not isinstance(response.get("message"), dict):
+            return success, response
+
+        proof = response["message"]
+
+    height = proof.get("header", {}).get("height") if isinstance(proof.get("header"), dict) else None
+    trusted_header = get_trusted_header(height) if isinstance(height, int) else None
+    if trusted_header is None or blockchain_proof.verify_proof(proof, trusted_header) is None:
+        health_record_proofs.pop(health_record_id, None)
+        return False, {"error": "Blockchain returned a proof that does not match the header peers' block"}
+
+    if fetched:
+        _cache_put(health_record_proofs, health_record_id, proof, PROOF_CACHE_SIZE)
+
+    if blockchain_proof.verify_health_record(proof, health_record_id, health_record, trusted_header):
+        return True, {"message": "Health record is valid!"}
+
+    return True, {"message": "Health record is invalid!"}
+
 
 def serialize_doc(doc):
     result = {}